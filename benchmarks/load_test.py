@@ -0,0 +1,151 @@
+"""End-to-end load test of the dictionary modules against local mock servers.
+
+A batch of distinct terms is looked up through dictionaries.iter_search (the same path the window and the
+command line use), with the dictionary's base_url pointed at a benchmarks.mock_server server. Reports total
+time, throughput, p50/p99 per-term latency (from the start of a term's lookup to its result), the responses
+the server sent, and the peak resident memory of the process. The lookup cache and the archive are turned off so
+every term goes to the server.
+
+Run from the repository root:
+    python -m benchmarks.load_test --dictionary WordReference --terms 1000 --latency 0.1 --jitter 0.05
+    python -m benchmarks.load_test --dictionary Morfix --terms 10000 --concurrency 16 --error-rate 0.01
+"""
+import argparse
+import resource
+import sys
+import threading
+import time
+from benchmarks import mock_server
+from languages import archive, cache, dictionaries, fetcher, ratelimit
+
+# The language each dictionary is tested with.
+test_languages = {"WordReference": "French", "ArabDict": "Arabic", "Morfix": "Hebrew", "MDBG": "Chinese"}
+
+
+def percentile(values, p):
+    """This function returns the p-th percentile (0-100) of a sorted list of values."""
+    if len(values) == 0:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def peak_rss_mb():
+    """This function returns the peak resident memory of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    if sys.platform == 'darwin':
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+def run(dictionary, n_terms, behavior, concurrency=None, cancel_after=None, rate=None):
+    """This function looks up n_terms terms on a mock server for dictionary and returns the measurements.
+
+    If cancel_after is given, the search is canceled (i.e. the generator is closed) after that many results,
+    to check how quickly the batch stops. rate limits the requests per second sent to the server.
+    """
+    servers = mock_server.start_servers(behavior, [dictionary])
+    original = mock_server.point_backends(servers)
+    host = fetcher.host_of(servers[dictionary].address())
+    if concurrency is not None:
+        fetcher.host_limits[host] = concurrency
+    if rate is not None:
+        ratelimit.host_rates[host] = rate
+
+    # Time each term from the start of its lookup until its result is ready.
+    latencies = []
+    latencies_lock = threading.Lock()
+    lookup = fetcher.lookup
+
+    def timed_lookup(*args, **kwargs):
+        start = time.perf_counter()
+        result = lookup(*args, **kwargs)
+        with latencies_lock:
+            latencies.append(time.perf_counter() - start)
+        return result
+
+    fetcher.lookup = timed_lookup
+    cache_enabled = cache.enabled
+    cache.enabled = False
+    archive_enabled = archive.enabled
+    archive.enabled = False
+
+    terms = ["term" + str(i) for i in range(n_terms)]
+    found = 0
+    failed = 0
+    done = 0
+    error = None
+    start = time.perf_counter()
+    lookups = dictionaries.iter_search(terms, test_languages[dictionary], dictionary, True, False)
+    try:
+        for i, term, result in lookups:
+            done += 1
+            if result.found():
+                found += 1
+            elif result.error(term, result.url).startswith("Could not look up"):
+                failed += 1
+            if cancel_after is not None and done >= cancel_after:
+                break
+    except Exception as e:
+        error = e
+    finally:
+        lookups.close()
+    elapsed = time.perf_counter() - start
+
+    fetcher.lookup = lookup
+    cache.enabled = cache_enabled
+    archive.enabled = archive_enabled
+    mock_server.restore_backends(original)
+    servers[dictionary].stop()
+
+    latencies.sort()
+    return {'done': done,
+            'found': found,
+            'failed': failed,
+            'error': error,
+            'seconds': elapsed,
+            'throughput': done / elapsed if elapsed > 0 else 0,
+            'p50': percentile(latencies, 50),
+            'p99': percentile(latencies, 99),
+            'responses': dict(servers[dictionary].counts),
+            'peak_rss_mb': peak_rss_mb()
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a dictionary module against a local mock server.")
+    parser.add_argument('--dictionary', choices=list(test_languages), default="WordReference")
+    parser.add_argument('--terms', type=int, default=1000, help="Number of distinct terms to look up.")
+    parser.add_argument('--concurrency', type=int, help="Concurrent requests allowed to the mock server.")
+    parser.add_argument('--latency', type=float, default=0.05, help="Server latency in seconds.")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random +/- seconds added to latency.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 500.")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429.")
+    parser.add_argument('--rate', type=float, help="Requests per second allowed to the mock server.")
+    parser.add_argument('--parse-workers', type=int, default=0, help="Processes to parse pages in (0: inline).")
+    parser.add_argument('--cancel-after', type=int, help="Cancel the batch after this many results.")
+    args = parser.parse_args(argv)
+
+    fetcher.parse_workers = args.parse_workers
+    behavior = mock_server.Behavior(args.latency, args.jitter, args.error_rate, args.throttle_rate,
+                                    args.retry_after)
+    m = run(args.dictionary, args.terms, behavior, args.concurrency, args.cancel_after, args.rate)
+
+    print("dictionary:      " + args.dictionary)
+    print("terms done:      {} of {} ({} with results, {} failed)".format(m['done'], args.terms, m['found'],
+                                                                          m['failed']))
+    print("total time:      {:.2f} s".format(m['seconds']))
+    print("throughput:      {:.1f} terms/s".format(m['throughput']))
+    print("latency p50:     {:.1f} ms".format(m['p50'] * 1000))
+    print("latency p99:     {:.1f} ms".format(m['p99'] * 1000))
+    print("responses:       " + ", ".join(str(k) + ": " + str(v) for k, v in sorted(m['responses'].items())))
+    print("peak RSS:        {:.1f} MB".format(m['peak_rss_mb']))
+    if m['error'] is not None:
+        print("batch stopped by error: " + repr(m['error']))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
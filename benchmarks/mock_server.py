@@ -0,0 +1,210 @@
+"""A local stand-in for the dictionary websites, serving the pages in benchmarks/fixtures.
+
+The pages captured by record_pages.py are served if there are any, so that parsing costs what it does on the
+real websites; otherwise each dictionary's small hand-written pages are.
+
+Each dictionary gets its own server (and so its own host:port, like the real websites), which answers every
+request with one of that dictionary's fixture pages. Latency, jitter, server errors (500), throttling
+(429 with Retry-After) and validators (ETag and Last-Modified, answering conditional requests with 304) can be
+configured, so concurrency, caching, revalidation, retries and cancellation can be tested without the network.
+
+Use point_backends() to make the dictionary modules send their requests to the servers, or run this file to
+serve the pages for manual testing:
+    python -m benchmarks.mock_server --latency 0.2 --jitter 0.1 --error-rate 0.05
+"""
+import argparse
+import os
+import random
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from languages import arabic_arabdict, chinese_mdbg, hebrew_morfix, wordreference
+from benchmarks import parse_benchmark
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# The hand-written pages each dictionary's server answers with if none have been recorded, and the page it
+# answers with for a term that isn't found. Which page a request gets depends on its path, so the same term
+# always gets the same page.
+miss_pages = {"WordReference": "wr_notfound.html",
+              "ArabDict": "arabdict_notfound.html",
+              "Morfix": "morfix_notfound.html",
+              "MDBG": "mdbg_notfound.html"
+              }
+dictionary_pages = {"WordReference": ["wr_enfr_house.html", "wr_enfr_house.html", "wr_notfound.html"],
+                    "ArabDict": ["arabdict_house.html", "arabdict_house.html", "arabdict_notfound.html"],
+                    "Morfix": ["morfix_enTohe.html", "morfix_heToen.html", "morfix_notfound.html"],
+                    "MDBG": ["mdbg_nihao.html", "mdbg_nihao.html", "mdbg_notfound.html"]
+                    }
+
+# The dictionary modules and the path that their base_url is replaced with (after the server's address).
+backends = {"WordReference": (wordreference, "/"),
+            "ArabDict": (arabic_arabdict, "/en/english-arabic/"),
+            "Morfix": (hebrew_morfix, "/"),
+            "MDBG": (chinese_mdbg, "/chinese/dictionary?")
+            }
+
+
+class Behavior:
+    """How a mock server responds.
+
+    latency = Seconds to wait before answering.
+    jitter = Up to this many seconds are randomly added to or taken off latency.
+    error_rate = Fraction of requests answered with 500 Internal Server Error.
+    throttle_rate = Fraction of requests answered with 429 Too Many Requests.
+    retry_after = Seconds sent in the Retry-After header of 429 responses.
+    validators = Whether pages are sent with an ETag and a Last-Modified header, and conditional requests for an
+                 unchanged page are answered with 304 Not Modified.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1, validators=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.validators = validators
+
+
+def make_handler(pages, behavior, counts):
+    """This function returns a request handler class serving pages (a list of page bodies) with behavior."""
+    counts_lock = threading.Lock()
+
+    # The pages never change, so each one's ETag is its checksum and it was last modified when the server started.
+    etags = ['"' + str(zlib.crc32(page)) + '"' for page in pages]
+    last_modified = formatdate(usegmt=True)
+
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 keeps connections alive, like the real websites, so connection pooling can be tested too.
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            delay = behavior.latency + random.uniform(-behavior.jitter, behavior.jitter)
+            if delay > 0:
+                time.sleep(delay)
+
+            roll = random.random()
+            if roll < behavior.error_rate:
+                self.reply(500, b"Internal Server Error")
+            elif roll < behavior.error_rate + behavior.throttle_rate:
+                self.reply(429, b"Too Many Requests", {'Retry-After': str(behavior.retry_after)})
+            else:
+                n = zlib.crc32(self.path.encode('utf-8')) % len(pages)
+                if not behavior.validators:
+                    self.reply(200, pages[n])
+                elif self.headers.get('If-None-Match') == etags[n] or \
+                        self.headers.get('If-Modified-Since') == last_modified:
+                    self.reply(304, b"", {'ETag': etags[n]})
+                else:
+                    self.reply(200, pages[n], {'ETag': etags[n], 'Last-Modified': last_modified})
+
+        def reply(self, status, body, headers=None):
+            with counts_lock:
+                counts[status] = counts.get(status, 0) + 1
+            self.send_response(status)
+            if status != 304:
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+            if headers is not None:
+                for key, value in headers.items():
+                    self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def page_files(dictionary):
+    """This function returns the fixture files that dictionary's server answers with.
+
+    These are the pages of dictionary recorded by record_pages.py and its miss page, or dictionary_pages
+    if none of its pages have been recorded.
+    """
+    recorded = [os.path.join("recorded", p['file']) for p in parse_benchmark.recorded_pages()
+                if p['dictionary'] == dictionary]
+    if len(recorded) == 0:
+        return dictionary_pages[dictionary]
+    return recorded + [miss_pages[dictionary]]
+
+
+class MockServer:
+    """A mock dictionary website running on a background thread. counts holds the number of responses by status."""
+
+    def __init__(self, dictionary, behavior, host='127.0.0.1', port=0):
+        self.dictionary = dictionary
+        self.behavior = behavior
+        self.counts = {}
+
+        pages = []
+        for name in page_files(dictionary):
+            with open(os.path.join(fixtures, name), 'rb') as f:
+                pages.append(f.read())
+
+        self.server = ThreadingHTTPServer((host, port), make_handler(pages, behavior, self.counts))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return "http://" + host + ":" + str(port)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_servers(behavior, dictionaries=None):
+    """This function starts a mock server for each dictionary (all four by default) and returns them by name."""
+    if dictionaries is None:
+        dictionaries = list(dictionary_pages)
+    return {d: MockServer(d, behavior) for d in dictionaries}
+
+
+def point_backends(servers):
+    """This function points the dictionary modules' base_url at the mock servers.
+
+    Returns the original base URLs, which can be passed to restore_backends().
+    """
+    original = {}
+    for dictionary, server in servers.items():
+        module, path = backends[dictionary]
+        original[dictionary] = module.base_url
+        module.base_url = server.address() + path
+    return original
+
+
+def restore_backends(original):
+    """This function puts back the base URLs returned by point_backends()."""
+    for dictionary, url in original.items():
+        backends[dictionary][0].base_url = url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recorded dictionary pages locally.")
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--validators', action='store_true')
+    args = parser.parse_args(argv)
+
+    behavior = Behavior(args.latency, args.jitter, args.error_rate, args.throttle_rate, validators=args.validators)
+    servers = start_servers(behavior)
+    for dictionary, server in servers.items():
+        print(dictionary + ": " + server.address() + backends[dictionary][1])
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Offline benchmark of the parse/extract step of every dictionary module.
+
+Each recorded case feeds a page captured from a dictionary website (see record_pages.py) to the dictionary
+module's parse() function, so no network access is needed and only parsing is timed. For every recorded case
+it reports pages per second, the average time per page and the peak memory allocated while parsing one page.
+WordReference cases are run once with each of its page readers (lxml and BeautifulSoup).
+
+The small hand-written pages in benchmarks/fixtures are edge cases (reversed results, strict search, misses).
+They are far smaller than real pages, so they are only checked, not timed, once pages have been recorded.
+Until then they are timed instead, so that parser changes can still be compared with each other; their pages
+per second are much higher than on real pages and don't say how fast a real batch is parsed.
+
+The rendered result of every case is checked against benchmarks/fixtures/expected, so a parser change
+that alters what users see makes the benchmark fail.
+
+Run from the repository root:
+    python -m benchmarks.record_pages                       (once, to capture the pages)
+    python -m benchmarks.parse_benchmark
+    python -m benchmarks.parse_benchmark --filter morfix --seconds 2
+    python -m benchmarks.parse_benchmark --update-expected    (after an intended change in output)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from functools import partial
+from languages import arabic_arabdict, chinese_mdbg, hebrew_morfix, wordreference
+from languages.fetcher import Page
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+expected_dir = os.path.join(fixtures, "expected")
+
+# recorded_dir holds the captured pages, and manifest lists them (see record_pages.py).
+recorded_dir = os.path.join(fixtures, "recorded")
+manifest = os.path.join(recorded_dir, "pages.json")
+
+
+def wordreference_parse(language_pair, strict_search):
+    """This function returns WordReference's parse function set up for language_pair, as search() would."""
+    pair_info = wordreference.url_ending(language_pair)[1]
+    return partial(wordreference.parse, pair_info=pair_info, strict_search=strict_search)
+
+
+def parse_function(dictionary, language_pair, strict_search):
+    """This function returns the parse function of dictionary set up as a search would."""
+    if dictionary == "WordReference":
+        return wordreference_parse(language_pair, strict_search)
+    return {"ArabDict": arabic_arabdict.parse,
+            "Morfix": hebrew_morfix.parse,
+            "MDBG": chinese_mdbg.parse
+            }[dictionary]
+
+
+# Each edge case is (name, parse function, fixture file, URL the page stands in for).
+edge_cases = [("wordreference en-fr", wordreference_parse(['English', 'French'], True),
+               "wr_enfr_house.html", "https://www.wordreference.com/enfr/house"),
+              ("wordreference fr-en reversed", wordreference_parse(['French', 'English'], False),
+               "wr_fren_chat_reversed.html", "https://www.wordreference.com/fren/chat"),
+              ("wordreference fr-en reversed strict", wordreference_parse(['French', 'English'], True),
+               "wr_fren_chat_reversed.html", "https://www.wordreference.com/fren/chat"),
+              ("wordreference es-en", wordreference_parse(['Spanish', 'English'], True),
+               "wr_es_casa.html", "https://www.wordreference.com/es/en/translation.asp?spen=casa"),
+              ("wordreference en-es reversed strict", wordreference_parse(['English', 'Spanish'], True),
+               "wr_es_casa.html", "https://www.wordreference.com/es/translation.asp?tranword=casa"),
+              ("wordreference de-en", wordreference_parse(['German', 'English'], True),
+               "wr_deen_haus.html", "https://www.wordreference.com/deen/Haus"),
+              ("wordreference en-gr", wordreference_parse(['English', 'Greek'], False),
+               "wr_engr_house.html", "https://www.wordreference.com/engr/house"),
+              ("wordreference not found", wordreference_parse(['English', 'French'], True),
+               "wr_notfound.html", "https://www.wordreference.com/enfr/qwzx"),
+              ("arabdict hit", arabic_arabdict.parse,
+               "arabdict_house.html", "https://www.arabdict.com/en/english-arabic/house"),
+              ("arabdict miss", arabic_arabdict.parse,
+               "arabdict_notfound.html", "https://www.arabdict.com/en/english-arabic/qwzx"),
+              ("morfix enTohe", hebrew_morfix.parse,
+               "morfix_enTohe.html", "https://www.morfix.co.il/house"),
+              ("morfix heToen", hebrew_morfix.parse,
+               "morfix_heToen.html", "https://www.morfix.co.il/בית"),
+              ("morfix miss", hebrew_morfix.parse,
+               "morfix_notfound.html", "https://www.morfix.co.il/qwzx"),
+              ("mdbg simplified/traditional", chinese_mdbg.parse,
+               "mdbg_nihao.html", "https://www.mdbg.net/chinese/dictionary?wdqb=你好"),
+              ("mdbg miss", chinese_mdbg.parse,
+               "mdbg_notfound.html", "https://www.mdbg.net/chinese/dictionary?wdqb=qwzx"),
+              ]
+
+
+def recorded_pages():
+    """This function returns the entries of manifest, or an empty list if no pages have been recorded."""
+    if not os.path.exists(manifest):
+        return []
+    with open(manifest, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def recorded_cases():
+    """This function returns a case (name, parse function, fixture file, URL) for each recorded page."""
+    return [("recorded " + p['name'], parse_function(p['dictionary'], p['pair'], p['strict']),
+             os.path.join("recorded", p['file']), p['url']) for p in recorded_pages()]
+
+
+def load_page(fixture, url):
+    with open(os.path.join(fixtures, fixture), encoding='utf-8') as f:
+        return Page(url, f.read())
+
+
+def expected_path(name):
+    return os.path.join(expected_dir, name.replace(' ', '_').replace('/', '_') + ".txt")
+
+
+def measure(parse, page, seconds):
+    """This function parses page repeatedly for about seconds.
+
+    Returns a tuple: pages per second, milliseconds per page and peak KiB allocated while parsing one page.
+    """
+    # Warm up (e.g. lazily compiled queries) before timing.
+    parse("term", page)
+
+    n = 0
+    start = time.perf_counter()
+    elapsed = 0
+    while elapsed < seconds:
+        parse("term", page)
+        n += 1
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    parse("term", page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return n / elapsed, elapsed / n * 1000, peak / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dictionary parsers on recorded pages.")
+    parser.add_argument('--seconds', type=float, default=0.5, help="How long to time each case for.")
+    parser.add_argument('--filter', default='', help="Only run cases whose name contains this text.")
+    parser.add_argument('--update-expected', action='store_true',
+                        help="Write the current output of each case as its expected output.")
+    args = parser.parse_args(argv)
+
+    recorded = recorded_cases()
+    time_edge_cases = len(recorded) == 0
+    if time_edge_cases:
+        print("No recorded pages in " + recorded_dir + ",\nso the hand-written pages are timed instead. "
+              "They are far smaller than real pages, so only compare\nthese timings with each other. "
+              "Run python -m benchmarks.record_pages to capture real pages.\n")
+    print("{:<44} {:>10} {:>10} {:>12} {:>8}".format("case", "pages/s", "ms/page", "peak KiB", "KiB"))
+    failures = []
+    cases = [(True, c) for c in recorded] + [(time_edge_cases, c) for c in edge_cases]
+    for timed, (name, parse, fixture, url) in cases:
+        if args.filter not in name:
+            continue
+        page = load_page(fixture, url)
+
+        readers = [None]
+        if getattr(parse, 'func', None) is wordreference.parse:
+            readers = ['lxml', 'soup']
+
+        for reader in readers:
+            label = name
+            if reader is not None:
+                wordreference.parser = reader
+                label += " (" + reader + ")"
+
+            text = parse("term", page).render()
+            if args.update_expected:
+                os.makedirs(expected_dir, exist_ok=True)
+                with open(expected_path(name), 'w', encoding='utf-8') as f:
+                    f.write(text)
+            else:
+                with open(expected_path(name), encoding='utf-8') as f:
+                    if f.read() != text:
+                        failures.append(label)
+
+            size = len(page.text.encode('utf-8')) / 1024
+            if timed:
+                rate, ms, peak = measure(parse, page, args.seconds)
+                print("{:<44} {:>10.1f} {:>10.3f} {:>12.1f} {:>8.1f}".format(label, rate, ms, peak, size))
+            else:
+                print("{:<44} {:>10} {:>10} {:>12} {:>8.1f}".format(label, "edge", "-", "-", size))
+
+    wordreference.parser = 'lxml'
+    if len(failures) > 0:
+        print("\nOutput differs from benchmarks/fixtures/expected for: " + ", ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
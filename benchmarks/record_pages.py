@@ -0,0 +1,97 @@
+"""Capture real dictionary pages for the parse benchmark (parse_benchmark.py).
+
+Each recording is downloaded once through the dictionary module's own fetch function, so the page is exactly
+what a search would parse. Only <script>, <style> and <noscript> blocks and HTML comments are removed (they
+hold the websites' scripts and ads and are never read by the parsers); the rest of the page is kept as served.
+The pages are written to benchmarks/fixtures/recorded with a manifest (pages.json) of where and when each one
+was recorded, and the output of each page is written to benchmarks/fixtures/expected.
+
+Run from the repository root (this needs network access):
+    python -m benchmarks.record_pages
+    python -m benchmarks.record_pages --filter mdbg
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from languages import arabic_arabdict, chinese_mdbg, hebrew_morfix, wordreference
+from languages.fetcher import Page
+from benchmarks.parse_benchmark import expected_path, manifest, parse_function, recorded_dir
+
+# Each recording is (name, dictionary, language pair for WordReference or None, strict search, term).
+# The terms are common words, whose pages are among the largest a user gets.
+recordings = [("wordreference en-fr house", "WordReference", ['English', 'French'], True, "house"),
+              ("wordreference fr-en chat", "WordReference", ['French', 'English'], False, "chat"),
+              ("wordreference es-en casa", "WordReference", ['Spanish', 'English'], True, "casa"),
+              ("wordreference en-es house", "WordReference", ['English', 'Spanish'], True, "house"),
+              ("wordreference de-en Haus", "WordReference", ['German', 'English'], True, "Haus"),
+              ("wordreference en-gr house", "WordReference", ['English', 'Greek'], False, "house"),
+              ("arabdict house", "ArabDict", None, False, "house"),
+              ("morfix house", "Morfix", None, False, "house"),
+              ("morfix bayit", "Morfix", None, False, "בית"),
+              ("mdbg nihao", "MDBG", None, False, "你好"),
+              ("mdbg zhongguoren", "MDBG", None, False, "中国人")
+              ]
+
+# Blocks that are removed from recorded pages.
+trimmed = re.compile(r'<(script|style|noscript)\b.*?</\1\s*>|<!--.*?-->', re.S | re.I)
+
+
+def fetch_function(dictionary, language_pair):
+    """This function returns the fetch function of dictionary set up as a search would."""
+    if dictionary == "WordReference":
+        l_term = wordreference.url_ending(language_pair)[0]
+        return lambda term: wordreference.fetch(term, l_term=l_term)
+    return {"ArabDict": arabic_arabdict.fetch,
+            "Morfix": hebrew_morfix.fetch,
+            "MDBG": chinese_mdbg.fetch
+            }[dictionary]
+
+
+def file_name(name):
+    return name.replace(' ', '_').replace('/', '_') + ".html"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record dictionary pages for the parse benchmark.")
+    parser.add_argument('--filter', default='', help="Only record pages whose name contains this text.")
+    args = parser.parse_args(argv)
+
+    pages = []
+    if os.path.exists(manifest):
+        with open(manifest, encoding='utf-8') as f:
+            pages = json.load(f)
+    os.makedirs(recorded_dir, exist_ok=True)
+
+    for name, dictionary, language_pair, strict_search, term in recordings:
+        if args.filter not in name:
+            continue
+        r = fetch_function(dictionary, language_pair)(term)
+        if r.status_code != 200:
+            print(name + ": HTTP " + str(r.status_code) + ", not recorded", file=sys.stderr)
+            continue
+        text = trimmed.sub('', r.text)
+        with open(os.path.join(recorded_dir, file_name(name)), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        result = parse_function(dictionary, language_pair, strict_search)(term, Page(r.url, text))
+        with open(expected_path("recorded " + name), 'w', encoding='utf-8') as f:
+            f.write(result.render())
+
+        pages = [p for p in pages if p['name'] != name]
+        pages.append({'name': name, 'dictionary': dictionary, 'pair': language_pair, 'strict': strict_search,
+                      'file': file_name(name), 'url': r.url, 'recorded': time.strftime('%Y-%m-%d'),
+                      'served_bytes': len(r.content)})
+        print(name + ": " + str(len(r.content) // 1024) + " KiB served, " + str(len(text.encode('utf-8')) // 1024)
+              + " KiB kept")
+
+    pages.sort(key=lambda p: p['name'])
+    with open(manifest, 'w', encoding='utf-8') as f:
+        json.dump(pages, f, ensure_ascii=False, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
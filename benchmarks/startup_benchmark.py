@@ -0,0 +1,91 @@
+"""Benchmark of how long the window takes to show, from starting Python to the first pass of Qt's event loop.
+
+Each run starts main.py in a fresh Python process, which quits as soon as the window has been shown, and the
+wall time of the whole process is taken. The benchmark fails if the median time is over target_seconds, or if
+a module that should only be imported once a search starts (requests, BeautifulSoup, lxml or a dictionary
+module) was imported while starting up.
+
+Without a display (e.g. on a server), Qt's offscreen platform is used.
+
+Run from the repository root:
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --runs 10 --target 0.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# target_seconds is the longest acceptable median startup time.
+target_seconds = 0.5
+
+# Modules that must not be imported before the window shows.
+deferred_modules = ['requests', 'bs4', 'lxml', 'languages.fetcher', 'languages.wordreference',
+                    'languages.arabic_arabdict', 'languages.hebrew_morfix', 'languages.chinese_mdbg',
+                    'languages.chinese_cedict']
+
+# Started in the new process: quit once the window is shown, then report which modules were imported.
+launcher = """
+import json, sys
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+def exec_and_quit(app):
+    QTimer.singleShot(0, app.quit)
+    return app.exec()
+
+QApplication.exec_ = exec_and_quit
+try:
+    import main
+except SystemExit:
+    pass
+print(json.dumps([m for m in %r if m in sys.modules]))
+"""
+
+
+def start_once(root, env):
+    """This function starts the window once and returns the wall time and the deferred modules it imported."""
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', launcher % (deferred_modules,)], cwd=root, env=env,
+                         stdout=subprocess.PIPE, check=True).stdout
+    elapsed = time.perf_counter() - start
+    return elapsed, json.loads(out.decode('utf-8').splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark how long the window takes to show.")
+    parser.add_argument('--runs', type=int, default=5, help="Number of times to start the window.")
+    parser.add_argument('--target', type=float, default=target_seconds, help="Longest acceptable median, in s.")
+    args = parser.parse_args(argv)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    if sys.platform.startswith('linux') and 'DISPLAY' not in env and 'WAYLAND_DISPLAY' not in env:
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    times = []
+    imported = set()
+    for i in range(args.runs):
+        elapsed, modules = start_once(root, env)
+        times.append(elapsed)
+        imported.update(modules)
+        print("run {}: {:.3f} s".format(i + 1, elapsed))
+
+    median = statistics.median(times)
+    print("median: {:.3f} s (target {:.3f} s)".format(median, args.target))
+
+    failed = False
+    if median > args.target:
+        print("Startup is slower than the target.")
+        failed = True
+    if len(imported) > 0:
+        print("Imported before the window showed: " + ", ".join(sorted(imported)))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Look up a list of terms from the command line, without the GUI.
+
+Terms are read one per line from a file (or stdin). Blank lines are skipped and repeated terms are only
+looked up once. Results are written to stdout as JSON lines or TSV, in input order, as soon as each one
+(and every term before it) has been looked up. Progress is reported on stderr.
+
+With --text, the input is running text (e.g. a chapter) instead: its words are picked out and each one is
+looked up once, most frequent first.
+
+Example:
+    python cli.py --language French --to-english words.txt > results.jsonl
+"""
+import argparse
+import json
+import sys
+from languages import archive, dictionaries, fetcher, search_index, trace
+
+
+class ProgressReporter:
+    """Reports progress on a text stream (stderr by default), in place of the window's ticker page."""
+
+    def __init__(self, stream=sys.stderr, quiet=False):
+        self.stream = stream
+        self.quiet = quiet
+
+    def update_ticker(self, x, y):
+        """This function reports that x out of y terms are done. Returns False, as there is no cancel button."""
+        if not self.quiet:
+            self.stream.write("\r" + str(x) + " out of " + str(y))
+            if x == y:
+                self.stream.write("\n")
+            self.stream.flush()
+        return False
+
+
+def clean(text):
+    """This function replaces tabs and newlines in text so it fits in one TSV field."""
+    if text is None:
+        return ''
+    return " ".join(text.split())
+
+
+def tsv_rows(index, result):
+    """This function returns the TSV lines for a result: one per entry, or one with the error message.
+
+    Columns: index, term, dictionary, headword, clarifying information, translations, source URL.
+    For Chinese, the headword is simplified/traditional, the clarifying information is the pinyin
+    and the translations are the definitions. A MergedResult gives the rows of each of its dictionaries.
+    """
+    if hasattr(result, 'results'):
+        rows = []
+        for r in result.results:
+            rows += tsv_rows(index, r)
+        return rows
+
+    prefix = [str(index), clean(result.term), result.source]
+    if not result.found():
+        message = result.error(result.term, result.url).split('\n')[0]
+        return ["\t".join(prefix + ['', '', clean(message), result.url])]
+
+    rows = []
+    for e in result.entries:
+        if hasattr(e, 'piny'):
+            headword = e.simp
+            if e.trad is not None:
+                headword += "/" + e.trad
+            row = [headword, e.piny, e.defs]
+        else:
+            translations = []
+            for t in e.l2:
+                if t.add:
+                    translations.append(clean(t.word) + " " + clean(t.add))
+                else:
+                    translations.append(clean(t.word))
+            row = [e.l1, e.l1_add, "; ".join(translations)]
+        rows.append("\t".join(prefix + [clean(x) for x in row] + [result.url]))
+    return rows
+
+
+def write_result(out, fmt, index, result):
+    """This function writes one result to out in fmt ('jsonl' or 'tsv')."""
+    if fmt == 'jsonl':
+        d = result.as_dict()
+        d['index'] = index
+        out.write(json.dumps(d, ensure_ascii=False) + "\n")
+    else:
+        for row in tsv_rows(index, result):
+            out.write(row + "\n")
+    out.flush()
+
+
+def read_lines(path):
+    """This function reads the lines of path ('-' for stdin)."""
+    if path == '-':
+        return sys.stdin.read().splitlines()
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Look up a list of terms on a foreign-language dictionary.")
+    parser.add_argument('input', nargs='?', default='-',
+                        help="File with one term per line, or running text with --text (default: stdin).")
+    parser.add_argument('-l', '--language', required=True, choices=dictionaries.langs,
+                        help="Foreign language to look terms up in.")
+    parser.add_argument('-d', '--dictionary',
+                        help="Dictionary to search on (default: the first one offered for the language), "
+                             "or 'all' for every dictionary offered for it.")
+    parser.add_argument('--to-english', action='store_true',
+                        help="Terms are in the foreign language (default: terms are in English). "
+                             "Only matters for languages that use the Latin alphabet.")
+    parser.add_argument('--allow-reversed', action='store_true',
+                        help="Allow search results with reversed language pair (i.e. turn off strict search).")
+    parser.add_argument('--casefold', action='store_true',
+                        help="Treat terms that only differ in capitalization as the same term. "
+                             "Only applies to languages that use the Latin alphabet.")
+    parser.add_argument('--text', action='store_true',
+                        help="The input is running text: look up each distinct word in the script of the language "
+                             "once, most frequent first, leaving out punctuation and numbers.")
+    parser.add_argument('--max-terms', type=int, metavar='N',
+                        help="With --text, only look up the N most frequent words.")
+    parser.add_argument('-f', '--format', choices=['jsonl', 'tsv'], default='jsonl', help="Output format.")
+    parser.add_argument('--parse-workers', type=int, default=0, metavar='N',
+                        help="Parse pages in N worker processes, to use several cores on large batches "
+                             "(default: 0, parse on the download threads).")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="Write the timings of each lookup to FILE as a Chrome trace (chrome://tracing) "
+                             "and print a summary of them on stderr.")
+    parser.add_argument('--replay', action='store_true',
+                        help="Take pages from the archive of downloaded pages instead of the network, e.g. to parse "
+                             "them again after a dictionary module has changed.")
+    parser.add_argument('--archive', metavar='DIR',
+                        help="Archive directory to keep downloaded pages in, or to replay (default: " + archive.path
+                             + ").")
+    parser.add_argument('--index', metavar='FILE',
+                        help="Also write an index of the words in the results to FILE, to search them later with "
+                             "python -m languages.search_index FILE QUERY. Results are numbered as in the output.")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Don't report progress on stderr.")
+    args = parser.parse_args(argv)
+
+    options = dictionaries.search_options(args.language)
+    if args.dictionary is None:
+        args.dictionary = options[0]
+    elif args.dictionary == 'all':
+        args.dictionary = dictionaries.all_dictionaries
+    if args.dictionary not in options:
+        parser.error(args.language + " can be looked up on: " + ", ".join(options))
+    if args.max_terms is not None and not args.text:
+        parser.error("--max-terms only applies with --text")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.text:
+        terms = dictionaries.text_terms("\n".join(read_lines(args.input)), args.language, args.casefold,
+                                        args.max_terms)
+    else:
+        terms = dictionaries.clean_terms(read_lines(args.input), args.language, args.casefold)
+    reporter = ProgressReporter(quiet=args.quiet)
+    fetcher.parse_workers = args.parse_workers
+    if args.archive is not None:
+        archive.path = args.archive
+    if args.replay:
+        fetcher.replay_archive = archive.Archive(archive.path)
+
+    recorder = None
+    if args.trace is not None:
+        recorder = trace.Recorder()
+        trace.add_hook(recorder)
+
+    result_index = None
+    if args.index is not None:
+        result_index = search_index.ResultIndex()
+
+    lookups = dictionaries.iter_search(terms, args.language, args.dictionary, not args.to_english,
+                                       not args.allow_reversed)
+
+    # Results arrive in the order lookups finish. Hold on to them only until every earlier term is done,
+    # so output is in input order but still starts before the whole batch has finished.
+    waiting = {}
+    next_index = 0
+    n = 1
+    try:
+        for i, term, result in lookups:
+            waiting[i] = result
+            if result_index is not None:
+                result_index.add(i, result)
+            while next_index in waiting:
+                write_result(sys.stdout, args.format, next_index, waiting.pop(next_index))
+                next_index += 1
+            reporter.update_ticker(n, len(terms))
+            n += 1
+    except KeyboardInterrupt:
+        sys.stderr.write("\nCanceled.\n")
+        return 130
+    finally:
+        lookups.close()
+        if result_index is not None:
+            result_index.save(args.index)
+        if recorder is not None:
+            trace.remove_hook(recorder)
+            recorder.save(args.trace)
+            if not args.quiet:
+                sys.stderr.write(recorder.summary() + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,19 +1,31 @@
-import requests
 from bs4 import BeautifulSoup
+from languages import fetcher, sessions, trace
+from languages.results import Entry, Translation, Result, error_result
 
+# base_url is the address terms are appended to in order to look them up.
+base_url = "https://www.arabdict.com/en/english-arabic/"
 
-def print_entry(w):
-    """This function compiles entry(w) into a string."""
-    entry = "English:\n"
-    entry += "  " + w['l1']
-    if 'l1_add' in w:
-        entry += " " + w['l1_add']
-    entry += "\nArabic:\n"
-    entry += w['l2']
-    if 'l2_add' in w:
-        entry += " " + w['l2_add']
-    entry += '\n\n'
-    return entry
+# cache_key is the dictionary name and language pair that this module's pages are cached under.
+cache_key = ("ArabDict", "english-arabic")
+
+
+def print_entry(w, pair=None):
+    """This function compiles Entry w into a string. pair is unused, as ArabDict is always English-Arabic."""
+    entry = ["English:\n", "  ", w.l1]
+    if w.l1_add is not None:
+        entry += [" ", w.l1_add]
+    entry.append("\nArabic:\n")
+    for t in w.l2:
+        entry.append(t.word)
+        if t.add is not None:
+            entry += [" ", t.add]
+    entry.append('\n\n')
+    return ''.join(entry)
+
+
+def print_error(term, url):
+    """This function returns an error message for when no valid search results exist."""
+    return "No results found for " + term + " on ArabDict!\nSource: " + url
 
 
 def strip(w):
@@ -68,66 +80,60 @@ def check_search_success(entry):
     return True
 
 
-# This function looks up terms on ArabDict.com and extracts the results.
-def arabdict(terms, ticker):
-    """This function looks up terms on ArabDict.com and extracts the results.
+def fetch(term):
+    """This function downloads the ArabDict.com page for term."""
+    return sessions.get(base_url + term)
 
-    terms = Terms to look up.
-    ticker = Window with ticker page to update progress.
 
-    Returns a list of results compiled into strings.
+def parse(term, r):
+    """This function extracts the search results for term from its downloaded ArabDict.com page r.
+
+    Returns a Result.
     """
-    # Create an empty list for the results.
-    total_results = []
+    # Get BeautifulSoup.
+    with trace.span('parse'):
+        soup = BeautifulSoup(r.text, "lxml")
 
-    # Start ticker variable.
-    n = 1
+    entries = soup.findAll("div", class_="rec-body description")
 
-    # If user clicks cancel button, cancel_process will be set to True.
-    cancel_process = False
+    # Check if search failed and return error result if it did.
+    if not check_search_success(soup):
+        return error_result(term, "ArabDict", r.url, print_error)
 
-    for t in terms:
-        if cancel_process:
-            break
+    # Declare empty list for word.
+    results = []
 
-        # Get BeautifulSoup.
-        url = "https://www.arabdict.com/en/english-arabic/" + t
-        r = requests.get(url, timeout=10)
-        soup = BeautifulSoup(r.text, "lxml")
+    for e in entries:
+        # Entry's l1 and l2 refer to English and Arabic words respectively.
+        english, english_clarify = get_entries(e, 'latin')
+        arabic, arabic_clarify = get_entries(e, 'arabic')
 
-        entries = soup.findAll("div", class_="rec-body description")
+        # Keep clarifying information only if there is something to add.
+        if english_clarify == '':
+            english_clarify = None
+        if arabic_clarify == '':
+            arabic_clarify = None
 
-        # Check if search failed and add error message if it did.
-        if not check_search_success(soup):
-            total_results.append("No results found for " + t + " on ArabDict!\nSource: " + r.url)
-        else:
-            # Declare empty string for word.
-            results = ''
+        entry = Entry(english, english_clarify)
+        entry.l2.append(Translation(arabic, arabic_clarify))
 
-            for e in entries:
-                # Declare empty dictionary for entry.
-                entry = {}
+        # Add entry to word search results.
+        results.append(entry)
 
-                # Entry's l1 and l2 keys refer to English and Arabic words respectively.
-                entry["l1"], english_clarify = get_entries(e, 'latin')
-                entry["l2"], arabic_clarify = get_entries(e, 'arabic')
+    return Result(term, "ArabDict", r.url, results, None, print_entry)
 
-                # Define l1_add and l2_add keys only if there is something to add.
-                if english_clarify != '':
-                    entry["l1_add"] = english_clarify
-                if arabic_clarify != '':
-                    entry["l2_add"] = arabic_clarify
 
-                # Add entry to word search results.
-                results += print_entry(entry)
+def iter_arabdict(terms, cancel=None, on_result=None):
+    """This function looks up terms on ArabDict.com and yields (index, term, Result) as each lookup finishes."""
+    return fetcher.iter_fetch(terms, fetch, parse, fetcher.host_of(base_url), cache_key, cancel, on_result)
 
-            # Add word search results to total results.
-            results += "\nSource:\n" + r.url
-            total_results.append(results)
 
-        # Update ticker to show progress.
-        # Ticker returns True if user clicked cancel button.
-        cancel_process = ticker.update_ticker(n, len(terms))
-        n += 1
+def arabdict(terms, ticker):
+    """This function looks up terms on ArabDict.com and extracts the results.
+
+    terms = Terms to look up.
+    ticker = Window with ticker page to update progress.
 
-    return total_results
+    Returns a list of Results.
+    """
+    return fetcher.collect(iter_arabdict(terms), len(terms), ticker)
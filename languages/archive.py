@@ -0,0 +1,192 @@
+"""Keep every page downloaded from the dictionaries, so they can be parsed again later without the network.
+
+Unlike the lookup cache (cache.py), nothing is ever removed from the archive. Pages are zlib-compressed and
+appended to segment files, and each segment has an index file with one JSON line per page:
+    [offset, length, time fetched, dictionary, language pair, term, url]
+Readers memory-map the segments, so going through a large archive only reads the pages it parses.
+
+Each process that downloads pages writes its own segments, starting a new one once segment_bytes is reached,
+so several windows or command lines can add to the same archive at once.
+
+To parse archived pages again, e.g. after a dictionary module's extraction has been fixed, set
+fetcher.replay_archive to an Archive (the command line's --replay does this). Searches then take pages from
+the archive instead of the network, through the same dictionary modules. To list the archived terms:
+    python -m languages.archive terms WordReference enfr/ > terms.txt
+"""
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, namedtuple
+from languages import normalize
+
+# Settings for the archive. These can be changed before the first search is started.
+# path = Directory the segments are kept in.
+# segment_bytes = How large a segment may grow before a new one is started.
+# enabled = Set to False to not archive downloaded pages.
+path = os.path.join(os.path.expanduser("~"), ".vocabsearcher", "archive")
+segment_bytes = 64 * 1024 * 1024
+enabled = True
+
+_writer = None
+_writer_lock = threading.Lock()
+
+# Record is the index entry of an archived page. segment is the segment's file name without its extension.
+Record = namedtuple('Record', ['dictionary', 'pair', 'term', 'url', 'fetched', 'segment', 'offset', 'length'])
+
+
+def segment_names(directory):
+    """This function returns the names of the segments in directory, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.idx'))
+
+
+class ArchiveWriter:
+    """Appends pages to this process's segment of an archive."""
+
+    def __init__(self, directory, segment_bytes):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+
+        # data and index are the open files of the current segment, None until the first page is added.
+        self.data = None
+        self.index = None
+
+    def new_segment(self):
+        """This function starts a new segment, numbered after the newest one. Must be called holding self.lock."""
+        self.close_segment()
+        os.makedirs(self.directory, exist_ok=True)
+        names = segment_names(self.directory)
+        n = int(names[-1].split('-')[1]) + 1 if len(names) > 0 else 1
+        while True:
+            name = os.path.join(self.directory, "segment-" + str(n).zfill(6))
+            try:
+                # Creating the index exclusively claims the number, in case another process is doing the same.
+                self.index = open(name + '.idx', 'x', encoding='utf-8')
+                break
+            except FileExistsError:
+                n += 1
+        self.data = open(name + '.dat', 'ab')
+
+    def put(self, dictionary, pair, term, url, text):
+        """This function archives the downloaded page text of term, found at url."""
+        body = zlib.compress(text.encode('utf-8'))
+        with self.lock:
+            if self.data is None or 0 < self.data.tell() and self.data.tell() + len(body) > self.segment_bytes:
+                self.new_segment()
+            offset = self.data.tell()
+            self.data.write(body)
+            self.data.flush()
+
+            # The page is only written to the index once its body is in the segment.
+            entry = [offset, len(body), time.time(), dictionary, pair, normalize.normalize(term), url]
+            self.index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.index.flush()
+
+    def close_segment(self):
+        if self.data is not None:
+            self.data.close()
+            self.index.close()
+            self.data = None
+            self.index = None
+
+    def close(self):
+        with self.lock:
+            self.close_segment()
+
+
+class Archive:
+    """Reads the pages of an archive. The index is read when the Archive is made; pages are read when asked for."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+
+        # maps holds the memory map of each segment that has been read from.
+        self.maps = {}
+
+        # latest is the Record of the most recently fetched page of each (dictionary, pair, term).
+        self.latest = {}
+        for segment in segment_names(directory):
+            with open(os.path.join(directory, segment + '.idx'), encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        # The last line of a segment that is still being written may not be finished.
+                        break
+                    offset, length, fetched, dictionary, pair, term, url = json.loads(line)
+                    record = Record(dictionary, pair, term, url, fetched, segment, offset, length)
+                    key = (dictionary, pair, term)
+                    if key not in self.latest or self.latest[key].fetched <= fetched:
+                        self.latest[key] = record
+
+    def records(self, dictionary=None, pair=None):
+        """This function returns the Records of the archived pages, in the order they are stored.
+
+        dictionary, pair = Only return pages of this dictionary and language pair, unless left as None.
+        """
+        output = [r for r in self.latest.values()
+                  if (dictionary is None or r.dictionary == dictionary) and (pair is None or r.pair == pair)]
+        output.sort(key=lambda r: (r.segment, r.offset))
+        return output
+
+    def segment_map(self, segment, end):
+        """This function returns a memory map of segment that reaches at least to end."""
+        with self.lock:
+            m = self.maps.get(segment)
+            if m is None or len(m) < end:
+                # Segments that are still being written are mapped again once they have grown.
+                if m is not None:
+                    m.close()
+                with open(os.path.join(self.directory, segment + '.dat'), 'rb') as f:
+                    m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.maps[segment] = m
+            return m
+
+    def text(self, record):
+        """This function returns the text of the page record refers to."""
+        m = self.segment_map(record.segment, record.offset + record.length)
+        return zlib.decompress(m[record.offset:record.offset + record.length]).decode('utf-8')
+
+    def get(self, dictionary, pair, term):
+        """This function returns the archived (url, text) of term, or None if it isn't in the archive."""
+        record = self.latest.get((dictionary, pair, normalize.normalize(term)))
+        if record is None:
+            return None
+        return record.url, self.text(record)
+
+    def close(self):
+        with self.lock:
+            for m in self.maps.values():
+                m.close()
+            self.maps.clear()
+
+
+def default_writer():
+    """This function returns the writer for the archive at path, or None if archiving is disabled."""
+    global _writer
+    if not enabled:
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = ArchiveWriter(path, segment_bytes)
+        return _writer
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('stats', 'terms'):
+        print("Usage: python -m languages.archive stats\n"
+              "       python -m languages.archive terms DICTIONARY [PAIR]")
+        sys.exit(2)
+    archive = Archive(path)
+    if sys.argv[1] == 'stats':
+        counts = Counter((r.dictionary, r.pair) for r in archive.records())
+        for (dictionary, pair), n in sorted(counts.items()):
+            print(dictionary + "\t" + pair + "\t" + str(n))
+    else:
+        for r in archive.records(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None):
+            print(r.term)
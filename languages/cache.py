@@ -0,0 +1,219 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from languages import normalize, revalidate
+
+# Settings for the on-disk lookup cache. These can be changed before the first search is started.
+# path = Where the cache is stored.
+# ttl = How many seconds a cached page is used for before it is revalidated or downloaded again (see revalidate.py).
+# max_bytes = How large the stored (compressed) pages may grow before the least recently used ones are removed.
+# enabled = Set to False to always go to the network.
+path = os.path.join(os.path.expanduser("~"), ".vocabsearcher", "cache.sqlite3")
+ttl = 30 * 24 * 60 * 60
+max_bytes = 200 * 1024 * 1024
+enabled = True
+
+# touch_batch is how many cache hits are kept in memory before their last-used times are written to the cache.
+touch_batch = 500
+
+_default = None
+_default_lock = threading.Lock()
+
+# CachedPage is a page in the cache. fresh is whether it is younger than ttl, and validators are the
+# revalidate.Validators it was served with (None if the website didn't send any).
+CachedPage = namedtuple('CachedPage', ['url', 'text', 'fresh', 'validators'])
+
+
+class PageCache:
+    """A SQLite store of downloaded dictionary pages.
+
+    Pages are keyed by dictionary, language pair and term, normalized as normalize.normalize() does (without
+    case folding, which the search already did if the language needs it). The body is stored zlib-compressed,
+    along with the ETag and Last-Modified headers it was served with, so it can be revalidated once it expires.
+    Every hit updates the entry's last-used time, which is what eviction goes by once max_bytes is exceeded.
+    Hits only note the time in memory, so that reading the cache doesn't write to the disk; the times are written
+    together every touch_batch hits, before pages are added or evicted, and when the cache is closed.
+    """
+
+    def __init__(self, db_path, ttl, max_bytes):
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # Searches look terms up from several threads, so one connection is shared behind a lock.
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ':memory:':
+            # With write-ahead logging, a commit appends to the log instead of rewriting pages of the database,
+            # and NORMAL only syncs the log at checkpoints. A crash can then only lose the latest commits,
+            # which for a cache only means downloading those pages again.
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS pages ("
+                        "dictionary TEXT, pair TEXT, term TEXT, url TEXT, body BLOB, size INTEGER, "
+                        "fetched REAL, used REAL, etag TEXT, last_modified TEXT, "
+                        "PRIMARY KEY (dictionary, pair, term))")
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages (used)")
+
+        # Caches made before validators were stored don't have their columns yet.
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(pages)")]
+        for column in ('etag', 'last_modified'):
+            if column not in columns:
+                self.db.execute("ALTER TABLE pages ADD COLUMN " + column + " TEXT")
+        self.db.commit()
+
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+        # touched maps the keys of pages that were hit to when, until they are written by write_touches().
+        self.touched = {}
+
+    def get(self, dictionary, pair, term):
+        """This function returns the cached (url, text) for a term, or None if it isn't cached or has expired."""
+        page = self.entry(dictionary, pair, term)
+        if page is None or not page.fresh:
+            return None
+        return page.url, page.text
+
+    def entry(self, dictionary, pair, term):
+        """This function returns the cached page for a term as a CachedPage, even if it has expired.
+
+        Returns None if the term isn't cached.
+        """
+        key = (dictionary, pair, normalize.normalize(term))
+        with self.lock:
+            row = self.db.execute("SELECT url, body, fetched, etag, last_modified FROM pages "
+                                  "WHERE dictionary=? AND pair=? AND term=?", key).fetchone()
+            if row is None:
+                return None
+            self.touched[key] = time.time()
+            if len(self.touched) >= touch_batch:
+                self.write_touches()
+                self.db.commit()
+        validators = None
+        if row[3] is not None or row[4] is not None:
+            validators = revalidate.Validators(row[3], row[4])
+        return CachedPage(row[0], zlib.decompress(row[1]).decode('utf-8'), time.time() - row[2] <= self.ttl,
+                          validators)
+
+    def put(self, dictionary, pair, term, url, text, validators=None):
+        """This function stores the downloaded page for a term, evicting old entries if the cache is too big.
+
+        validators = The revalidate.Validators the page was served with, or None.
+        """
+        key = (dictionary, pair, normalize.normalize(term))
+        body = zlib.compress(text.encode('utf-8'))
+        now = time.time()
+        if validators is None:
+            validators = revalidate.Validators(None, None)
+        with self.lock:
+            old = self.db.execute("SELECT size FROM pages WHERE dictionary=? AND pair=? AND term=?", key).fetchone()
+            if old is not None:
+                self.total_bytes -= old[0]
+            self.db.execute("INSERT OR REPLACE INTO pages "
+                            "(dictionary, pair, term, url, body, size, fetched, used, etag, last_modified) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            key + (url, body, len(body), now, now) + tuple(validators))
+            self.total_bytes += len(body)
+            self.touched.pop(key, None)
+            self.write_touches()
+            self.evict()
+            self.db.commit()
+
+    def refresh(self, dictionary, pair, term, validators=None):
+        """This function marks the cached page for a term as fetched now, after the website said it hasn't changed.
+
+        validators = Validators sent with the 304 Not Modified response, which replace the stored ones, or None.
+        """
+        key = (dictionary, pair, normalize.normalize(term))
+        now = time.time()
+        with self.lock:
+            self.touched.pop(key, None)
+            if validators is None:
+                self.db.execute("UPDATE pages SET fetched=?, used=? WHERE dictionary=? AND pair=? AND term=?",
+                                (now, now) + key)
+            else:
+                self.db.execute("UPDATE pages SET fetched=?, used=?, etag=COALESCE(?, etag), "
+                                "last_modified=COALESCE(?, last_modified) WHERE dictionary=? AND pair=? AND term=?",
+                                (now, now) + tuple(validators) + key)
+            self.db.commit()
+
+    def write_touches(self):
+        """This function writes the last-used times of the pages hit since it was last called.
+
+        Must be called while holding self.lock. The caller commits.
+        """
+        if len(self.touched) == 0:
+            return
+        self.db.executemany("UPDATE pages SET used=? WHERE dictionary=? AND pair=? AND term=?",
+                            [(used,) + key for key, used in self.touched.items()])
+        self.touched.clear()
+
+    def evict(self):
+        """This function removes least recently used pages until the cache fits in max_bytes.
+
+        Must be called while holding self.lock.
+        """
+        while self.total_bytes > self.max_bytes:
+            rows = self.db.execute("SELECT dictionary, pair, term, size FROM pages ORDER BY used LIMIT 100").fetchall()
+            if len(rows) == 0:
+                self.total_bytes = 0
+                break
+            for row in rows:
+                self.db.execute("DELETE FROM pages WHERE dictionary=? AND pair=? AND term=?", row[:3])
+                self.total_bytes -= row[3]
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def invalidate(self, dictionary=None, pair=None, term=None):
+        """This function removes cached pages. Any of dictionary, pair and term left as None matches everything.
+
+        E.g. invalidate("WordReference") removes every WordReference page, invalidate() empties the cache.
+        """
+        conditions = []
+        values = []
+        for column, value in (('dictionary', dictionary), ('pair', pair), ('term', term)):
+            if value is not None:
+                conditions.append(column + "=?")
+                values.append(normalize.normalize(value) if column == 'term' else value)
+        where = ''
+        if len(conditions) > 0:
+            where = " WHERE " + " AND ".join(conditions)
+        with self.lock:
+            self.write_touches()
+            self.db.execute("DELETE FROM pages" + where, values)
+            self.db.commit()
+            self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.write_touches()
+            self.db.commit()
+            self.db.close()
+
+
+def default_cache():
+    """This function returns the application's cache, opening it on first use. Returns None if it's disabled."""
+    global _default
+    if not enabled:
+        return None
+    with _default_lock:
+        if _default is None:
+            _default = PageCache(path, ttl, max_bytes)
+        return _default
+
+
+def close_default_cache():
+    """This function closes the application's cache, if it was opened, writing the last-used times of recent hits."""
+    global _default
+    with _default_lock:
+        if _default is not None:
+            _default.close()
+            _default = None
+
+
+atexit.register(close_default_cache)
@@ -0,0 +1,269 @@
+"""Look up Chinese terms in a local copy of CC-CEDICT, the dictionary MDBG's results come from.
+
+A CC-CEDICT file (e.g. cedict_ts.u8 from https://www.mdbg.net/chinese/dictionary?page=cedict) must first be
+imported into the store this module reads, which is done once with:
+    python -m languages.chinese_cedict path/to/cedict_ts.u8
+
+Lookups then need no network, and return the same ChineseEntry results as the MDBG module.
+"""
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from languages.results import ChineseEntry, Result, error_result, print_chinese_entry
+
+# store_path is where the imported dictionary is kept.
+store_path = os.path.join(os.path.expanduser("~"), ".vocabsearcher", "cedict.idx")
+
+# The store is a single file, read through a memory map so that only the parts that are looked at are loaded:
+#   header: magic, number of index records, offset of the index, offset of the keys
+#   entries: one "simplified\ttraditional\tpinyin\tdefinitions\n" line per entry, in UTF-8
+#   index: one record per headword (simplified, and traditional if different) and entry:
+#          offset and length of the headword in keys, offset and length of the entry's line.
+#          Records are sorted by headword (as UTF-8 bytes), so a headword is found by binary search.
+#   keys: the headwords, in UTF-8
+magic = b'VSCEDICT1\n'
+header = struct.Struct('<10sIQQ')
+record = struct.Struct('<IIQI')
+
+# A CC-CEDICT line: traditional, simplified, [pinyin], /definition/definition/.
+line_pattern = re.compile(r'^(\S+) (\S+) \[([^\]]*)\] /(.*)/\s*$')
+
+# Pinyin vowels with tone marks, by tone (1 to 4).
+tone_marks = {'a': 'āáǎà', 'e': 'ēéěè', 'i': 'īíǐì', 'o': 'ōóǒò', 'u': 'ūúǔù', 'ü': 'ǖǘǚǜ',
+              'A': 'ĀÁǍÀ', 'E': 'ĒÉĚÈ', 'I': 'ĪÍǏÌ', 'O': 'ŌÓǑÒ', 'U': 'ŪÚǓÙ', 'Ü': 'ǕǗǙǛ'}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def print_error(term, url):
+    """This function returns an error message for when no valid search results exist."""
+    return "No results found for " + term + " in CC-CEDICT!\nSource: " + url
+
+
+def not_imported(term, url):
+    """This function returns an error message for when no CC-CEDICT file has been imported yet."""
+    return ("CC-CEDICT has not been imported yet. Download cedict_ts.u8 and run:\n"
+            "python -m languages.chinese_cedict path/to/cedict_ts.u8")
+
+
+def syllable_with_tone(syllable):
+    """This function converts a syllable with a tone number (e.g. hao3) to one with a tone mark (e.g. hǎo)."""
+    syllable = syllable.replace('u:', 'ü').replace('U:', 'Ü')
+    if len(syllable) < 2 or syllable[-1] not in '12345' or not syllable[:-1].isalpha():
+        return syllable
+    tone = int(syllable[-1])
+    syllable = syllable[:-1]
+    if tone == 5:
+        return syllable
+
+    # The mark goes on a or e if there is one, on the o of ou, and otherwise on the last vowel.
+    lower = syllable.lower()
+    if 'a' in lower:
+        i = lower.index('a')
+    elif 'e' in lower:
+        i = lower.index('e')
+    elif 'ou' in lower:
+        i = lower.index('o')
+    else:
+        vowels = [n for n, c in enumerate(lower) if c in 'iouü']
+        if len(vowels) == 0:
+            return syllable
+        i = vowels[-1]
+    return syllable[:i] + tone_marks[syllable[i]][tone - 1] + syllable[i + 1:]
+
+
+def pinyin_with_tones(pinyin):
+    """This function converts CC-CEDICT's numbered pinyin (e.g. ni3 hao3) to pinyin with tone marks."""
+    return ' '.join(syllable_with_tone(s) for s in pinyin.split())
+
+
+def import_cedict(source, destination=None):
+    """This function imports the CC-CEDICT file source into a store at destination (store_path by default).
+
+    Returns the number of entries imported.
+    """
+    if destination is None:
+        destination = store_path
+
+    entries = bytearray()
+    headwords = []
+    n = 0
+    with open(source, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            match = line_pattern.match(line)
+            if match is None:
+                continue
+            trad, simp, pinyin, defs = match.groups()
+            text = '\t'.join([simp, trad, pinyin_with_tones(pinyin), ' / '.join(defs.split('/'))]) + '\n'
+            data = text.encode('utf-8')
+            location = (len(entries), len(data))
+            entries += data
+            headwords.append((simp.encode('utf-8'), location))
+            if trad != simp:
+                headwords.append((trad.encode('utf-8'), location))
+            n += 1
+
+    # Sorting is stable, so entries with the same headword stay in the order of the file.
+    headwords.sort(key=lambda h: h[0])
+    keys = bytearray()
+    index = bytearray()
+    entries_start = header.size
+    for key, (offset, length) in headwords:
+        index += record.pack(len(keys), len(key), entries_start + offset, length)
+        keys += key
+
+    index_start = entries_start + len(entries)
+    keys_start = index_start + len(index)
+    os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+    temporary = destination + ".tmp"
+    with open(temporary, 'wb') as f:
+        f.write(header.pack(magic, len(headwords), index_start, keys_start))
+        f.write(entries)
+        f.write(index)
+        f.write(keys)
+    os.replace(temporary, destination)
+    close_store()
+    return n
+
+
+class CedictStore:
+    """A read-only, memory-mapped store made by import_cedict()."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        found_magic, self.count, self.index_start, self.keys_start = header.unpack_from(self.map, 0)
+        if found_magic != magic:
+            raise ValueError(path + " is not a CC-CEDICT store made by import_cedict().")
+
+    def key(self, i):
+        """This function returns the headword of index record i, as UTF-8 bytes."""
+        key_offset, key_length, offset, length = record.unpack_from(self.map, self.index_start + i * record.size)
+        start = self.keys_start + key_offset
+        return self.map[start:start + key_length]
+
+    def first_at_least(self, key, low=0):
+        """This function returns the index of the first record from low on whose headword isn't less than key."""
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def longest_match(self, text, start):
+        """This function returns the length of the longest headword that text has at position start.
+
+        Returns 1 if no headword starts there, so that the character is taken on its own.
+        """
+        longest = 1
+        low = 0
+        for end in range(start + 1, len(text) + 1):
+            # Headwords starting with a longer prefix come after those starting with a shorter one,
+            # so each search can start where the last one ended.
+            prefix = text[start:end].encode('utf-8')
+            low = self.first_at_least(prefix, low)
+            if low == self.count:
+                break
+            key = self.key(low)
+            if not key.startswith(prefix):
+                break
+            if key == prefix:
+                longest = end - start
+        return longest
+
+    def lookup(self, term):
+        """This function returns the ChineseEntries whose simplified or traditional headword is term."""
+        key = term.encode('utf-8')
+        low = self.first_at_least(key)
+
+        output = []
+        seen = set()
+        while low < self.count and self.key(low) == key:
+            key_offset, key_length, offset, length = record.unpack_from(self.map,
+                                                                        self.index_start + low * record.size)
+            if offset not in seen:
+                seen.add(offset)
+                simp, trad, piny, defs = self.map[offset:offset + length].decode('utf-8').rstrip('\n').split('\t')
+                output.append(ChineseEntry(simp, trad if trad != simp else None, piny, defs))
+            low += 1
+        return output
+
+    def close(self):
+        self.map.close()
+
+
+def default_store():
+    """This function returns the store at store_path, opening it on first use. Returns None if it doesn't exist."""
+    global _store
+    with _store_lock:
+        if _store is None and os.path.exists(store_path):
+            _store = CedictStore(store_path)
+        return _store
+
+
+def close_store():
+    """This function closes the store if it is open, e.g. after it has been imported again."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+
+def lookup(term):
+    """This function looks term up in the local CC-CEDICT store and returns a Result."""
+    store = default_store()
+    if store is None:
+        return error_result(term, "CC-CEDICT", store_path, not_imported)
+    url = store.path + "#" + term
+    output = store.lookup(term)
+    if len(output) == 0:
+        return error_result(term, "CC-CEDICT", url, print_error)
+    return Result(term, "CC-CEDICT", url, output, None, print_chinese_entry)
+
+
+def iter_cedict(terms, cancel=None, on_result=None):
+    """This function looks up terms in the local CC-CEDICT store and yields (index, term, Result) for each.
+
+    Lookups don't use the network, so they are done one after another on the calling thread.
+    cancel = threading.Event that stops the lookups once it is set, or None.
+    on_result = Function called with (index, term, Result) for each term before it is yielded, or None.
+    """
+    for i, term in enumerate(terms):
+        if cancel is not None and cancel.is_set():
+            return
+        result = lookup(term)
+        if on_result is not None:
+            on_result(i, term, result)
+        yield i, term, result
+
+
+def cedict(terms, ticker):
+    """This function looks up terms in the local CC-CEDICT store.
+
+    terms = Terms to look up.
+    ticker = Window to update progress.
+
+    Returns a list of Results.
+    """
+    # fetcher is imported here, as it loads requests, the cache and the archive, which lookups in
+    # the local store don't need.
+    from languages import fetcher
+    return fetcher.collect(iter_cedict(terms), len(terms), ticker)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python -m languages.chinese_cedict path/to/cedict_ts.u8")
+        sys.exit(2)
+    print("Imported " + str(import_cedict(sys.argv[1])) + " entries into " + store_path)
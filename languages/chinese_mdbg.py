@@ -1,91 +1,82 @@
-import requests
 from bs4 import BeautifulSoup
+from languages import fetcher, sessions, trace
+from languages.results import ChineseEntry, Result, error_result, print_chinese_entry
 
+# base_url is the address of MDBG's search page. Terms are passed to it as the wdqb parameter.
+base_url = "https://www.mdbg.net/chinese/dictionary?"
 
-def print_entry(w):
-    """This function converts dictionary entry(w) into a formatted string."""
-    entry = "Chinese:\n"
-    if 'hanz' in w:
-        entry += "  Hanzi: " + w['hanz'] + '\n'
-    else:
-        entry += "  Simplified: " + w['simp'] + '\n'
-        entry += "  Traditional: " + w['trad'] + '\n'
-    entry += "  Pinyin: " + w['piny'] + '\n'
-    entry += "  Definition: " + w['defs'] + '\n\n'
-    return entry
+# cache_key is the dictionary name and language pair that this module's pages are cached under.
+cache_key = ("MDBG", "")
 
 
-def mdbg(terms, ticker):
-    """This function looks up terms on MDBG.net and extracts search results.
-
-    terms = Terms to look up.
-    ticker = Window to update progress.
+def print_error(term, url):
+    """This function returns an error message for when no valid search results exist."""
+    return "No results found for " + term + " on MDBG!\nSource: " + url
 
-    Returns a list of entries formatted into strings.
-    """
 
-    # Declare empty list for results and start ticker.
-    term_results = []
-    n = 1
+def fetch(term):
+    """This function downloads the MDBG.net search page for term."""
+    params = {"wdqb": term}
+    return sessions.get(base_url, params=params)
 
-    # If user clicks cancel button, cancel_process will be set to True.
-    cancel_process = False
 
-    for term in terms:
-        if cancel_process:
-            break
+def parse(term, r):
+    """This function extracts the search results for term from its downloaded MDBG.net page r.
 
-        # Get BeautifulSoup.
-        params = {"wdqb": term}
-        url = "https://www.mdbg.net/chinese/dictionary?"
-        r = requests.get(url, params=params, timeout=10)
+    Returns a Result.
+    """
+    # Get BeautifulSoup.
+    with trace.span('parse'):
         soup = BeautifulSoup(r.text, "lxml")
 
-        entries = soup.findAll("tr", class_="row")
-
-        # Declare empty string to contain all search results for each term.
-        output = ''
-
-        for i in entries:
-            # Create empty dictionary for each row.
-            result = {}
-
-            # Extract hanzi.
-            hanzis = i.find_all("div", class_="hanzi")
-            hanzi = []
-            for h in hanzis:
-                hanzi.append(h.text)
-
-            # If both traditional Chinese and Simplified Chinese are listed, then hanzi will have two results.
-            # Otherwise, it only has one.
-            if len(hanzi) == 2:
-                result["simp"] = hanzi[0]
-                result["trad"] = hanzi[1]
-            else:
-                result["hanz"] = hanzi[0]
-
-            # Extract pinyin pronunciation and definitions.
-            # For some reason, definitions on MDBG sometimes start with a space,
-            # hence the if statement to remove space if it exists.
-            result["piny"] = i.find("div", class_="pinyin").text
-            if result["piny"][0] == ' ':
-                result["piny"] = result["piny"][1:]
-            result["defs"] = i.find("div", class_="defs").text
-
-            # Add this row's data to the result for the term.
-            output += print_entry(result)
-
-        # If results were found, entries would have results added to it. Add to term_results.
-        # If no results were found, entries would still be ''. Add error message instead.
-        if len(output) == 0:
-            term_results.append("No results found for " + term + " on MDBG!\nSource: " + r.url)
+    entries = soup.findAll("tr", class_="row")
+
+    # Declare empty list to contain all search results for the term.
+    output = []
+
+    for i in entries:
+        # Extract hanzi.
+        hanzis = i.find_all("div", class_="hanzi")
+        hanzi = []
+        for h in hanzis:
+            hanzi.append(h.text)
+
+        # If both traditional Chinese and Simplified Chinese are listed, then hanzi will have two results.
+        # Otherwise, it only has one.
+        if len(hanzi) == 2:
+            simp, trad = hanzi
         else:
-            output += "\nSource:\n" + r.url
-            term_results.append(output)
+            simp, trad = hanzi[0], None
+
+        # Extract pinyin pronunciation and definitions.
+        # For some reason, definitions on MDBG sometimes start with a space,
+        # hence the if statement to remove space if it exists.
+        piny = i.find("div", class_="pinyin").text
+        if piny[0] == ' ':
+            piny = piny[1:]
+        defs = i.find("div", class_="defs").text
 
-        # Update ticker to show progress.
-        # ticker returns True if user clicked cancel button.
-        cancel_process = ticker.update_ticker(n, len(terms))
-        n += 1
+        # Add this row's data to the result for the term.
+        output.append(ChineseEntry(simp, trad, piny, defs))
 
-    return term_results
+    # If results were found, output would have results added to it.
+    # If no results were found, output would still be empty. Return error result instead.
+    if len(output) == 0:
+        return error_result(term, "MDBG", r.url, print_error)
+    return Result(term, "MDBG", r.url, output, None, print_chinese_entry)
+
+
+def iter_mdbg(terms, cancel=None, on_result=None):
+    """This function looks up terms on MDBG.net and yields (index, term, Result) as each lookup finishes."""
+    return fetcher.iter_fetch(terms, fetch, parse, fetcher.host_of(base_url), cache_key, cancel, on_result)
+
+
+def mdbg(terms, ticker):
+    """This function looks up terms on MDBG.net and extracts search results.
+
+    terms = Terms to look up.
+    ticker = Window to update progress.
+
+    Returns a list of Results.
+    """
+    return fetcher.collect(iter_mdbg(terms), len(terms), ticker)
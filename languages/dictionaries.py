@@ -0,0 +1,254 @@
+import importlib
+import queue
+import threading
+from functools import partial
+from languages import memory, normalize, paragraph
+from languages.results import MergedResult
+
+# This module holds the language and dictionary options shared by the window and the command line,
+# and starts a search given those options. It doesn't import PyQt5.
+# The dictionary modules (and with them requests, BeautifulSoup and lxml) are only imported once a search
+# is started, so that the window can show as soon as possible.
+
+# langs is the list of languages that can be looked up, in the order they are offered to the user.
+langs = ['French',
+         'Spanish',
+         'Italian',
+         'Portuguese',
+         'Romanian',
+         'German',
+         'Dutch',
+         'Polish',
+         'Czech',
+         'Swedish',
+         'Icelandic',
+         'Turkish',
+         'Greek',
+         'Chinese',
+         'Korean',
+         'Arabic',
+         'Hebrew'
+         ]
+
+# langs_latin is a set of all the languages that use the Latin script.
+langs_latin = {'French',
+               'Spanish',
+               'Portuguese',
+               'Italian',
+               'Romanian',
+               'German',
+               'Dutch',
+               'Polish',
+               'Czech',
+               'Swedish',
+               'Icelandic',
+               'Turkish'
+               }
+
+# lang_search_options lists the dictionaries each language can be looked up on. The first is the default.
+lang_search_options = {'French': ["WordReference"],
+                       'Spanish': ["WordReference"],
+                       'Italian': ["WordReference"],
+                       'Portuguese': ["WordReference"],
+                       'Romanian': ["WordReference"],
+                       'German': ["WordReference"],
+                       'Dutch': ["WordReference"],
+                       'Polish': ["WordReference"],
+                       'Czech': ["WordReference"],
+                       'Swedish': ["WordReference"],
+                       'Icelandic': ["WordReference"],
+                       'Turkish': ["WordReference"],
+                       'Greek': ["WordReference"],
+                       'Chinese': ["MDBG", "CC-CEDICT"],
+                       'Korean': ["WordReference"],
+                       'Arabic': ["ArabDict", "WordReference"],
+                       'Hebrew': ["Morfix"]
+                       }
+
+# all_dictionaries is offered after the dictionaries of a language that has more than one. It looks each term up
+# on every one of them at the same time and shows their results together.
+all_dictionaries = "All dictionaries"
+
+# Module and name of the streaming search function of each dictionary, and its number of parameters.
+# WordReference requires language_pair and strict_search; other functions don't.
+search_functions = {"WordReference": ["languages.wordreference", "iter_search", 3],
+                    "MDBG": ["languages.chinese_mdbg", "iter_mdbg", 1],
+                    "CC-CEDICT": ["languages.chinese_cedict", "iter_cedict", 1],
+                    "ArabDict": ["languages.arabic_arabdict", "iter_arabdict", 1],
+                    "Morfix": ["languages.hebrew_morfix", "iter_morfix", 1]
+                    }
+
+
+def search_options(foreign_lang):
+    """This function returns the dictionaries that can be chosen for foreign_lang, including all_dictionaries."""
+    options = lang_search_options[foreign_lang]
+    if len(options) > 1:
+        return options + [all_dictionaries]
+    return options
+
+
+def language_pair(foreign_lang, en_to_l2):
+    """This function returns the list of source and target language, e.g. ['English', 'French']."""
+    if en_to_l2:
+        return ["English", foreign_lang]
+    return [foreign_lang, "English"]
+
+
+def search_function(dictionary):
+    """This function returns the streaming search function of dictionary and its number of parameters.
+
+    The dictionary's module is imported the first time it is needed.
+    """
+    module, name, n_params = search_functions[dictionary]
+    return getattr(importlib.import_module(module), name), n_params
+
+
+def effective_strict(foreign_lang, strict_search):
+    """This function returns the strict_search setting that is actually used for foreign_lang."""
+    # If foreign language does not use Latin alphabet, then strict_search does not matter.
+    if foreign_lang not in langs_latin:
+        return False
+    return strict_search
+
+
+def memory_options(foreign_lang, dictionary, en_to_l2, strict_search):
+    """This function returns the options that a search's results are remembered under in a memory.ResultMemory."""
+    return memory.ResultMemory.key(foreign_lang, dictionary, en_to_l2, effective_strict(foreign_lang, strict_search))
+
+
+def iter_search(terms, foreign_lang, dictionary, en_to_l2, strict_search, results_memory=None, cancel=None):
+    """This function starts looking terms up and returns a generator of (index, term, Result).
+
+    terms = Terms to look up, as returned by normalize.clean_lines().
+    foreign_lang = The foreign language selected.
+    dictionary = The dictionary selected.
+    en_to_l2 = Whether English is the source language (True) or the target language (False).
+    strict_search = Whether reverse-language results should be excluded.
+    results_memory = A memory.ResultMemory to take already known Results from and to remember new ones in,
+                     or None to look every term up.
+    cancel = threading.Event that the caller sets to cancel the search, or None. The generator then ends soon
+             after, without waiting for the lookups that are held up by the website (see fetcher.iter_fetch).
+
+    A term that appears several times is only looked up once, and its result is yielded for each position.
+    If dictionary is all_dictionaries, every dictionary of foreign_lang is searched and the results are
+    MergedResults (see iter_merged).
+    """
+    strict_search = effective_strict(foreign_lang, strict_search)
+
+    unique, positions = normalize.dedupe(terms)
+    if dictionary == all_dictionaries:
+        start = partial(iter_merged, foreign_lang=foreign_lang, names=lang_search_options[foreign_lang],
+                        en_to_l2=en_to_l2, strict_search=strict_search, cancel=cancel)
+    else:
+        start = partial(start_search, foreign_lang=foreign_lang, dictionary=dictionary, en_to_l2=en_to_l2,
+                        strict_search=strict_search, cancel=cancel)
+
+    if results_memory is None:
+        lookups = start(unique)
+    else:
+        options = memory_options(foreign_lang, dictionary, en_to_l2, strict_search)
+        lookups = memory.remembered(unique, options, results_memory, start)
+    return normalize.fan_out(lookups, positions)
+
+
+def start_search(terms, foreign_lang, dictionary, en_to_l2, strict_search, cancel=None, on_result=None):
+    """This function starts looking terms up on one dictionary and returns its generator of (index, term, Result).
+
+    The parameters are as for iter_search, but terms aren't deduplicated.
+    on_result = Function called with (index, term, Result) as each lookup finishes, or None
+                (see fetcher.iter_fetch).
+    """
+    f, n_params = search_function(dictionary)
+    if n_params == 3:
+        return f(terms, language_pair(foreign_lang, en_to_l2), strict_search, cancel, on_result)
+    return f(terms, cancel, on_result)
+
+
+def iter_merged(terms, foreign_lang, names, en_to_l2, strict_search, cancel=None, on_result=None):
+    """This function looks terms up on every dictionary in names at the same time.
+
+    Each dictionary's search runs on its own thread, so a term takes as long as its slowest dictionary
+    rather than all of them added up. Yields (index, term, MergedResult) once every dictionary has
+    answered for the term, with the Results in the same order as names. cancel and on_result are as for
+    start_search; on_result is called with the MergedResult.
+    """
+    from languages import ratelimit
+
+    # The Results are merged as each dictionary's lookups finish, so that terms finishing after the generator
+    # has been closed are still passed to on_result. Each MergedResult is put on the queue as (index,
+    # MergedResult, None), and each thread puts (None, None, exception or None) when its search has ended.
+    results_queue = queue.Queue()
+    stop = threading.Event()
+
+    # waiting holds the Results received so far for terms that some dictionary hasn't answered for yet.
+    waiting = {}
+    waiting_lock = threading.Lock()
+
+    def arrived(k, i, term, result):
+        with waiting_lock:
+            got = waiting.setdefault(i, [None] * len(names))
+            got[k] = result
+            if None in got:
+                return
+            del waiting[i]
+        merged = MergedResult(terms[i], got)
+        if on_result is not None:
+            on_result(i, terms[i], merged)
+        results_queue.put((i, merged, None))
+
+    def consume(k, name):
+        # Starting the search is inside the try too, so that a failure (e.g. an import error) still ends the
+        # thread with its end marker rather than leaving iter_merged waiting for it.
+        lookups = None
+        error = None
+        try:
+            lookups = start_search(terms, foreign_lang, name, en_to_l2, strict_search, stop, partial(arrived, k))
+            for item in lookups:
+                if stop.is_set():
+                    break
+        except Exception as e:
+            error = e
+        finally:
+            if lookups is not None:
+                lookups.close()
+            results_queue.put((None, None, error))
+
+    for k, name in enumerate(names):
+        threading.Thread(target=consume, args=(k, name), daemon=True).start()
+
+    running = len(names)
+    try:
+        while running > 0:
+            if cancel is not None and cancel.is_set():
+                return
+            try:
+                i, merged, error = results_queue.get(timeout=None if cancel is None else ratelimit.cancel_poll)
+            except queue.Empty:
+                continue
+            if i is None:
+                if error is not None:
+                    raise error
+                running -= 1
+                continue
+            yield i, terms[i], merged
+    finally:
+        # Tell the threads to stop their searches, which drops the terms that haven't started.
+        stop.set()
+
+
+def clean_terms(lines, foreign_lang, casefold=False):
+    """This function turns the lines typed by the user into the list of terms to search.
+
+    Case folding is only applied to languages that use the Latin alphabet, even if casefold is True.
+    """
+    return normalize.clean_lines(lines, casefold and foreign_lang in langs_latin, foreign_lang)
+
+
+def text_terms(text, foreign_lang, casefold=False, limit=None):
+    """This function picks out the words of text pasted as running prose, as the list of terms to search.
+
+    The distinct words in the script of foreign_lang are returned, most frequent first (see languages/paragraph.py).
+    limit = Greatest number of terms to return, or None for all of them.
+    """
+    ranked = paragraph.ranked_terms(text, foreign_lang, casefold, limit, foreign_lang in langs_latin)
+    return [term for term, count in ranked]
@@ -0,0 +1,281 @@
+import atexit
+import multiprocessing
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+from languages import archive, cache, ratelimit, revalidate, trace
+from languages.results import error_result
+
+# host_limits is the most requests that may be in flight at the same time for each dictionary website.
+# Websites that aren't listed here use default_limit. The ratelimit module lowers this while a website is
+# pushing back, and spreads requests out according to its host_rates.
+host_limits = {'www.wordreference.com': 4,
+               'www.arabdict.com': 4,
+               'www.morfix.co.il': 4,
+               'www.mdbg.net': 4
+               }
+default_limit = 4
+
+# parse_workers is the number of processes that pages are parsed in. With 0, pages are parsed on the threads
+# that download them, which is enough for the window. On large batches (especially with many cached pages),
+# parsing uses more CPU than one core can give, so the command line can set this to spread it over several
+# cores. At most parse_backlog pages wait to be parsed at once; download threads wait when it is full.
+parse_workers = 0
+parse_backlog = None
+
+# replay_archive is an archive.Archive to take pages from instead of the network and the lookup cache, e.g. to
+# parse archived pages again after a dictionary module has changed. None (the default) downloads pages as usual,
+# archiving them if archive.enabled is set.
+replay_archive = None
+
+_parse_pool = None
+_parse_slots = None
+_parse_pool_lock = threading.Lock()
+
+# Page holds the parts of a downloaded page that the dictionary modules use, whether it came from the network
+# or from the cache.
+Page = namedtuple('Page', ['url', 'text'])
+
+
+def host_of(url):
+    """This function returns the host name (e.g. www.mdbg.net) of url."""
+    return urlsplit(url).netloc
+
+
+def download_error(reason):
+    """This function returns an error message function (as for Result.error) for a page that couldn't be downloaded."""
+    def print_error(term, url):
+        return "Could not look up " + term + " (" + reason + ")! Try again later.\nSource: " + url
+
+    # transient marks the result as worth trying again, so it isn't remembered (see memory.py).
+    print_error.transient = True
+    return print_error
+
+
+def not_archived(term, url):
+    """This function returns an error message for a term whose page isn't in the archive being replayed."""
+    return "No archived page for " + term + "!\nArchive: " + url
+
+
+def parse_pool():
+    """This function returns the process pool and its backlog semaphore, starting them on first use.
+
+    Returns (None, None) if parse_workers is 0.
+    """
+    global _parse_pool, _parse_slots
+    with _parse_pool_lock:
+        if _parse_pool is None and parse_workers > 0:
+            # Worker processes are started fresh rather than forked, as forking a process that is running
+            # download threads can leave locks held in the child.
+            _parse_pool = ProcessPoolExecutor(max_workers=parse_workers,
+                                              mp_context=multiprocessing.get_context('spawn'))
+            _parse_slots = threading.BoundedSemaphore(parse_backlog or parse_workers * 2)
+        return _parse_pool, _parse_slots
+
+
+def close_parse_pool():
+    """This function stops the parse worker processes, if they were started."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=True, cancel_futures=True)
+            _parse_pool = None
+
+
+atexit.register(close_parse_pool)
+
+
+def parse_page(parse, term, page):
+    """This function runs parse(term, page), in a worker process if parse_workers is set.
+
+    Only the page's URL and text are sent to the worker, and only the Result (plain objects, no parse tree)
+    comes back. The dictionary module's parse function must be picklable (i.e. a module-level function or a
+    functools.partial of one).
+    """
+    pool, slots = parse_pool()
+    if pool is None:
+        return parse(term, page)
+    with slots:
+        # The worker process's own spans are lost, so its round trip is recorded as parse here (see trace.py).
+        with trace.span('parse'):
+            return pool.submit(parse, term, page).result()
+
+
+def lookup(term, fetch, parse, host, cache_key=None, queued=None, cancel=None):
+    """This function downloads and extracts the search results for a single term.
+
+    The download is scheduled and retried by the ratelimit module; parsing is not, as it doesn't use the network.
+    If cache_key (a tuple of dictionary name and language pair) is given, the page is taken from the
+    lookup cache when possible, and stored in it (and in the archive) after being downloaded otherwise.
+    Expired pages are revalidated with a conditional request, according to the website's policy in the
+    revalidate module, and used again if the website answers 304 Not Modified.
+    In replay mode (see replay_archive), the page is taken from the archive instead.
+
+    If the page still can't be downloaded after retrying, an error Result is returned instead of raising,
+    so one failed term doesn't stop the rest of the batch.
+
+    queued = time.perf_counter() when the lookup was handed to a worker thread, for the trace module.
+    cancel = threading.Event that is set if the search is canceled. A lookup that is still waiting for its turn
+             or to retry then stops, returning an error Result.
+    """
+    source = cache_key[0] if cache_key is not None else host
+    t = trace.begin(term, source, queued)
+    try:
+        store = None
+        if cache_key is not None:
+            store = cache.default_cache()
+
+        page = None
+        stale = None
+        if replay_archive is not None:
+            archived = None
+            if cache_key is not None:
+                archived = replay_archive.get(cache_key[0], cache_key[1], term)
+            if archived is None:
+                return error_result(term, source, replay_archive.directory, not_archived)
+            page = Page(*archived)
+        elif store is not None:
+            with trace.span('cache'):
+                cached = store.entry(cache_key[0], cache_key[1], term)
+            policy = revalidate.policy_for(host)
+            if cached is not None and cached.fresh and policy != revalidate.ALWAYS:
+                page = Page(cached.url, cached.text)
+            elif cached is not None and policy != revalidate.NEVER:
+                stale = cached
+            if t is not None:
+                t.cache = 'miss' if page is None else 'hit'
+
+        if page is None:
+            try:
+                with revalidate.conditional(stale.validators if stale is not None else None):
+                    r = ratelimit.request(host, host_limits.get(host, default_limit), fetch, term, cancel=cancel)
+            except ratelimit.GaveUp as e:
+                return error_result(term, source, e.url, download_error(e.reason))
+            except ratelimit.Canceled:
+                return error_result(term, source, host, download_error("canceled"))
+
+            if r.status_code == 304 and stale is not None:
+                # The cached page hasn't changed, so it is used again (and kept for another cache.ttl).
+                page = Page(stale.url, stale.text)
+                store.refresh(cache_key[0], cache_key[1], term, revalidate.validators_of(r))
+                if t is not None:
+                    t.cache = 'revalidated'
+            else:
+                page = Page(r.url, r.text)
+
+            # Only keep pages that were served successfully; errors should be retried next time.
+            if cache_key is not None and r.status_code == 200:
+                if store is not None:
+                    store.put(cache_key[0], cache_key[1], term, page.url, page.text, revalidate.validators_of(r))
+                writer = archive.default_writer()
+                if writer is not None:
+                    writer.put(cache_key[0], cache_key[1], term, page.url, page.text)
+
+        with trace.span('extract'):
+            return parse_page(parse, term, page)
+    finally:
+        trace.end(t)
+
+
+def finished_callback(finished, on_result, term, i, future):
+    """This function is called on a lookup's thread when it is done.
+
+    It passes the lookup's result to on_result (unless it is None, or the lookup was dropped or raised), then
+    puts the index i and future of the lookup on the queue finished.
+    """
+    if on_result is not None and not future.cancelled() and future.exception() is None:
+        on_result(i, term, future.result())
+    finished.put((i, future))
+
+
+def iter_fetch(terms, fetch, parse, host, cache_key=None, cancel=None, on_result=None):
+    """This function looks up all terms concurrently and yields each result as soon as it is ready.
+
+    terms, fetch, parse, host and cache_key are as for fetch_all.
+    cancel = threading.Event that the caller sets to cancel the search, or None. The generator then returns
+             within ratelimit.cancel_poll seconds, even while every lookup is still waiting on the website.
+    on_result = Function called with (index, term, result) on the lookup's thread as each lookup finishes, or
+                None. Unlike the generator, it is also called for lookups that finish after the generator has
+                been closed or canceled, e.g. to remember their results.
+
+    Yields tuples of (index of the term in terms, term, result), in the order the lookups finish.
+    Closing the generator early or canceling drops the terms that haven't started, and stops the lookups
+    that are waiting for their turn or to retry.
+    """
+    # stop is set once this search is over, so that the lookups still waiting in the ratelimit module give up.
+    stop = threading.Event()
+
+    # While pages are parsed in worker processes, extra threads keep downloads going as other threads wait
+    # for their pages to be parsed. Downloads are still limited to host_limits by the ratelimit module.
+    executor = ThreadPoolExecutor(max_workers=host_limits.get(host, default_limit) + parse_workers)
+    try:
+        # Each lookup puts its index and future on finished when it is done, in the order they finish.
+        finished = queue.Queue()
+        queued = time.perf_counter()
+        for i, t in enumerate(terms):
+            future = executor.submit(lookup, t, fetch, parse, host, cache_key, queued, stop)
+            future.add_done_callback(partial(finished_callback, finished, on_result, t, i))
+        done = 0
+        while done < len(terms):
+            if cancel is not None and cancel.is_set():
+                return
+            try:
+                i, future = finished.get(timeout=None if cancel is None else ratelimit.cancel_poll)
+            except queue.Empty:
+                continue
+            done += 1
+            yield i, terms[i], future.result()
+    finally:
+        # Drop any terms that haven't been started yet, e.g. because of cancellation or an error.
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_all(terms, fetch, parse, ticker, host, cache_key=None):
+    """This function looks up all terms concurrently and returns their results in the same order as terms.
+
+    terms = Terms to look up.
+    fetch = Function that takes a term and downloads its page.
+    parse = Function that takes a term and its page and extracts the search results.
+    ticker = Window with ticker page to update progress.
+    host = Website the terms are looked up on, used to limit the number of concurrent requests.
+    cache_key = Tuple of dictionary name and language pair to cache pages under, or None to not use the cache.
+
+    ticker.update_ticker is called from the calling thread each time a term finishes.
+    If it returns True (i.e. the user clicked cancel), terms that haven't started are dropped,
+    and only the results that were finished are returned, still in input order.
+    """
+    return collect(iter_fetch(terms, fetch, parse, host, cache_key), len(terms), ticker)
+
+
+def collect(lookups, total, ticker):
+    """This function gathers the results yielded by a streaming search into a list in input order.
+
+    lookups = Generator of (index, term, result), such as the one returned by iter_fetch.
+    total = Number of terms being looked up.
+    ticker = Window with ticker page to update progress.
+    """
+    results = [None] * total
+    done = [False] * total
+
+    # Start ticker variable.
+    n = 1
+
+    try:
+        for i, term, result in lookups:
+            results[i] = result
+            done[i] = True
+
+            # Update ticker to show progress.
+            # Ticker returns True if user clicked cancel button.
+            if ticker.update_ticker(n, total):
+                break
+            n += 1
+    finally:
+        lookups.close()
+
+    return [r for r, d in zip(results, done) if d]
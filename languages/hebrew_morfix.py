@@ -1,5 +1,12 @@
-import requests
 from bs4 import BeautifulSoup
+from languages import fetcher, sessions, trace
+from languages.results import Entry, Translation, Result, error_result
+
+# base_url is the address terms are appended to in order to look them up.
+base_url = "https://www.morfix.co.il/"
+
+# cache_key is the dictionary name and language pair that this module's pages are cached under.
+cache_key = ("Morfix", "")
 
 
 def print_entry(w, pair):
@@ -22,14 +29,19 @@ def print_entry(w, pair):
         l2_indent = "  "
 
     # Compile elements of entry into formatted text.
-    txt = ''
-    txt += langs[0] + ":\n"
-    txt += l1_indent + w['l1']
-    if w['l1_add'] != '':
-        txt += " (" + w['l1_add'] + ")"
-    txt += "\n" + langs[1] + ":\n"
-    txt += l2_indent + w['l2'] + "\n\n"
-    return txt
+    txt = [langs[0], ":\n", l1_indent, w.l1]
+    if w.l1_add != '':
+        txt += [" (", w.l1_add, ")"]
+    txt += ["\n", langs[1], ":\n"]
+    for t in w.l2:
+        txt += [l2_indent, t.word]
+    txt.append("\n\n")
+    return ''.join(txt)
+
+
+def print_error(term, url):
+    """This function returns an error message for when no valid search results exist."""
+    return "No results found for " + term + " on Morfix!\nSource: " + url
 
 
 def check_search_success(entry):
@@ -38,74 +50,71 @@ def check_search_success(entry):
     return len(error_msg) == 0
 
 
-def morfix(terms, ticker):
-    """This function iterates through a list of terms and looks them up on morfix.co.il.
+def fetch(term):
+    """This function downloads the morfix.co.il page for term."""
+    return sessions.get(base_url + term)
 
-    terms = The list of terms to look up.
-    ticker = The window to update with progress in order to communicate this progress to the user.
+
+def parse(term, r):
+    """This function extracts the search results for term from its downloaded morfix.co.il page r.
+
+    Returns a Result.
     """
-    # Assign empty list for search results.
-    total_results = []
+    # Get BeautifulSoup.
+    with trace.span('parse'):
+        soup = BeautifulSoup(r.text, "lxml")
 
-    # Initialize n for progress ticker.
-    n = 1
+    # Check validity of search results.
+    if not check_search_success(soup):
+        return error_result(term, "Morfix", r.url, print_error)
 
-    # If the user clicks the cancel button, cancel_process will turn True, and the for loop will stop.
-    cancel_process = False
+    # Create empty list for word.
+    word_entry = []
 
-    for t in terms:
-        if cancel_process:
-            break
+    # If search results contain Translation_content_enTohe, it is English to Hebrew.
+    # Otherwise, it's Hebrew to English.
+    entries = soup.findAll("div", class_="Translation_content_enTohe")
+    if len(entries) > 0:
+        language_pair = "enTohe"
+    else:
+        entries = soup.findAll("div", class_="Translation_content_heToen")
+        language_pair = "heToen"
 
-        # Get BeautifulSoup.
-        r = requests.get("https://www.morfix.co.il/" + t, timeout=10)
-        soup = BeautifulSoup(r.text, "lxml")
+    # Extract each individual entry.
+    for e in entries:
+        # l1 refers to source language word.
+        entry = Entry()
+        entry.l1 = e.find("span", class_="Translation_spTop_"+language_pair).text[:-1]
+
+        # l1_add refers to clarifier for source language word, if it exists.
+        entry.l1_add = e.find("span", class_="Translation_sp2Top_"+language_pair).text
 
-        # Check validity of search results.
-        if not check_search_success(soup):
-            total_results.append("No results found for " + t + " on Morfix!\nSource: " + r.url)
-
-        else:
-            # Create empty string for word.
-            word_entry = ''
-
-            # If search results contain Translation_content_enTohe, it is English to Hebrew.
-            # Otherwise, it's Hebrew to English.
-            entries = soup.findAll("div", class_="Translation_content_enTohe")
-            if len(entries) > 0:
-                language_pair = "enTohe"
-            else:
-                entries = soup.findAll("div", class_="Translation_content_heToen")
-                language_pair = "heToen"
-
-            # Extract each individual entry.
-            for e in entries:
-                # l1 refers to source language word.
-                entry = dict()
-                entry['l1'] = e.find("span", class_="Translation_spTop_"+language_pair).text[:-1]
-
-                # l1_add refers to clarifier for source language word, if it exists.
-                entry['l1_add'] = e.find("span", class_="Translation_sp2Top_"+language_pair).text
-
-                # l2 refers to translation results.
-                l2 = e.find("div", class_="normal_translation_div")
-
-                # For some reason, search results on Morfix end in many spaces and begin with two letters that create
-                # a newline. These two lines strip search results of this.
-                l2 = l2.text.replace('            ', '')
-                l2 = l2[2:]
-                entry['l2'] = l2
-
-                # Once finished, add formatted entry to word_entry.
-                word_entry += print_entry(entry, language_pair)
-
-            # Finally, add URL source to word results, and then word results to list of results.
-            word_entry += "\nSource:\n" + r.url
-            total_results.append(word_entry)
-
-        # Have ticker window update progress to communicate with user and update n.
-        # Window.update_ticker returns True if user clicked the cancel button.
-        cancel_process = ticker.update_ticker(n, len(terms))
-        n += 1
-
-    return total_results
+        # l2 refers to translation results.
+        l2 = e.find("div", class_="normal_translation_div")
+
+        # For some reason, search results on Morfix end in many spaces and begin with two letters that create
+        # a newline. These two lines strip search results of this.
+        l2 = l2.text.replace('            ', '')
+        l2 = l2[2:]
+        entry.l2.append(Translation(l2))
+
+        # Once finished, add entry to word_entry.
+        word_entry.append(entry)
+
+    return Result(term, "Morfix", r.url, word_entry, language_pair, print_entry)
+
+
+def iter_morfix(terms, cancel=None, on_result=None):
+    """This function looks up terms on morfix.co.il and yields (index, term, Result) as each lookup finishes."""
+    return fetcher.iter_fetch(terms, fetch, parse, fetcher.host_of(base_url), cache_key, cancel, on_result)
+
+
+def morfix(terms, ticker):
+    """This function iterates through a list of terms and looks them up on morfix.co.il.
+
+    terms = The list of terms to look up.
+    ticker = The window to update with progress in order to communicate this progress to the user.
+
+    Returns a list of Results.
+    """
+    return fetcher.collect(iter_morfix(terms), len(terms), ticker)
@@ -61,3 +61,44 @@ l_terms = {'English': 'en',
            'Korean': 'ko',
            'Spanish': 'es'
            }
+
+# The tables below are built from the ones above when this module is imported,
+# so that looking up a language, code or header label is a single dictionary lookup.
+
+# code_names maps each two-letter abbreviation back to the name of its language, e.g. 'fr' to 'French'.
+code_names = {code: name for name, code in l_terms.items()}
+
+# header_codes maps each foreign language to the header labels that can appear on its WordReference pages,
+# each with the abbreviation of the language that label names, e.g. for French: 'Français' to 'fr', 'Anglais' to 'en'.
+header_codes = {'Spanish': {label: l_terms[name] for name, labels in spanish_terms.items() for label in labels}}
+for language in autoglottonyms:
+    header_codes[language] = {autoglottonyms[language]: l_terms[language], english_names[language]: l_terms['English']}
+
+
+class LanguagePair:
+    """Everything needed to read WordReference pages for one language pair, worked out once.
+
+    source, target = Names of the source and target languages, e.g. 'English' and 'French'.
+    foreign = The non-English language of the pair.
+    codes = Abbreviations of source and target together, e.g. 'enfr'.
+    header_codes = Header labels of the foreign language's pages and the abbreviation each one stands for.
+    """
+
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        self.foreign = target if source == 'English' else source
+        self.codes = l_terms[source] + l_terms[target]
+        self.header_codes = header_codes[self.foreign]
+
+
+# pairs holds the LanguagePair of every language pair that WordReference pages can be read for.
+pairs = {}
+for language in header_codes:
+    pairs[('English', language)] = LanguagePair('English', language)
+    pairs[(language, 'English')] = LanguagePair(language, 'English')
+
+
+def pair_for(language_pair):
+    """This function returns the LanguagePair for language_pair, a list of source and target language names."""
+    return pairs[tuple(language_pair)]
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+# This module keeps the Results of the terms looked up during this session in memory, so that a term that has
+# already been looked up (e.g. prefetched while the user was typing) is shown at once without going back to the
+# website or the lookup cache.
+
+# max_terms is how many Results are kept. Once there are more, the least recently used are dropped.
+max_terms = 20000
+
+
+def keep(result):
+    """This function returns whether result is worth remembering, i.e. it isn't a failed download."""
+    if hasattr(result, 'results'):
+        return all(keep(r) for r in result.results)
+    return not getattr(result.error, 'transient', False)
+
+
+class ResultMemory:
+    """Results kept in memory, by search options and term.
+
+    The options are a tuple of the foreign language, dictionary, direction and strict search, as made by key().
+    """
+
+    def __init__(self, max_terms=max_terms):
+        self.max_terms = max_terms
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(foreign_lang, dictionary, en_to_l2, strict_search):
+        """This function returns the options tuple that results of a search with these options are kept under."""
+        return foreign_lang, dictionary, en_to_l2, strict_search
+
+    def get(self, options, term):
+        """This function returns the remembered Result of term looked up with options, or None."""
+        with self.lock:
+            result = self.results.get((options, term))
+            if result is not None:
+                self.results.move_to_end((options, term))
+            return result
+
+    def put(self, options, term, result):
+        """This function remembers the Result of term looked up with options, unless its download failed."""
+        if not keep(result):
+            return
+        with self.lock:
+            self.results[(options, term)] = result
+            self.results.move_to_end((options, term))
+            while len(self.results) > self.max_terms:
+                self.results.popitem(last=False)
+
+    def count(self, options, terms):
+        """This function returns how many of the distinct terms have a remembered Result for options."""
+        with self.lock:
+            return sum(1 for term in set(terms) if (options, term) in self.results)
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+
+
+def remembered(terms, options, memory, start):
+    """This function yields (index, term, Result) for terms, taking them from memory where possible.
+
+    Remembered Results are yielded first, straight away. The other terms are looked up by
+    start(missing terms, on_result=function), which returns a streaming search over them and calls the function
+    as each lookup finishes. Their Results are remembered as the lookups finish, even those that finish after this
+    generator has been closed, and yielded (with their index in terms) as they arrive.
+    """
+    missing = []
+    missing_index = []
+    known = []
+    for i, term in enumerate(terms):
+        result = memory.get(options, term)
+        if result is None:
+            missing.append(term)
+            missing_index.append(i)
+        else:
+            known.append((i, term, result))
+
+    for item in known:
+        yield item
+    if len(missing) == 0:
+        return
+
+    def remember(i, term, result):
+        memory.put(options, term, result)
+
+    lookups = start(missing, on_result=remember)
+    try:
+        for i, term, result in lookups:
+            yield missing_index[i], term, result
+    finally:
+        lookups.close()
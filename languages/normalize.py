@@ -0,0 +1,79 @@
+import unicodedata
+
+# This module cleans up the terms typed or pasted by the user before they are looked up,
+# and collapses repeated terms so each one is only looked up once.
+
+# turkic_langs are the languages where dotted and dotless I are different letters (I/ı and İ/i).
+# str.casefold() doesn't know this and would turn İ into i plus a combining dot, which dictionaries don't match.
+turkic_langs = {'Turkish'}
+
+
+def fold_case(term, lang=None):
+    """This function makes term lower-case, keeping dotted and dotless I apart if lang is in turkic_langs."""
+    if lang in turkic_langs:
+        term = term.replace('\u0130', 'i').replace('I', '\u0131')
+    return term.casefold()
+
+
+def normalize(term, casefold=False, lang=None):
+    """This function normalizes a single term.
+
+    Whitespace (including tabs and the '\\r' left by text pasted from Windows) is trimmed from both ends and
+    collapsed to single spaces inside the term, and the term is put in Unicode NFC form, so that e.g. "é" typed
+    as one character and "é" typed as "e" plus an accent are the same term.
+    If casefold is True, the term is also made lower-case. This is only meant for languages using the Latin script.
+    lang = Language of the term, for the case folding of fold_case().
+    """
+    term = unicodedata.normalize('NFC', " ".join(term.split()))
+    if casefold:
+        term = fold_case(term, lang)
+    return term
+
+
+def clean_lines(lines, casefold=False, lang=None):
+    """This function normalizes every line and drops blank ones.
+
+    Returns the list of terms to search, one per non-blank line, in the same order.
+    """
+    terms = []
+    for line in lines:
+        term = normalize(line, casefold, lang)
+        if term != '':
+            terms.append(term)
+    return terms
+
+
+def dedupe(terms):
+    """This function collapses repeated terms.
+
+    Returns a tuple:
+    the list of unique terms, in order of first appearance,
+    and a list with, for each unique term, the list of positions in terms where it appears.
+    """
+    unique = []
+    positions = []
+    index_of = {}
+    for i, term in enumerate(terms):
+        if term in index_of:
+            positions[index_of[term]].append(i)
+        else:
+            index_of[term] = len(unique)
+            unique.append(term)
+            positions.append([i])
+    return unique, positions
+
+
+def fan_out(lookups, positions):
+    """This function passes each result of a search over unique terms on to every position the term appeared at.
+
+    lookups = Generator of (index into the unique terms, term, result), e.g. from one of the iter_ functions.
+    positions = Positions of each unique term, as returned by dedupe().
+
+    Yields (position, term, result), and closes lookups when it is closed.
+    """
+    try:
+        for i, term, result in lookups:
+            for position in positions[i]:
+                yield position, term, result
+    finally:
+        lookups.close()
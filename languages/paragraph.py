@@ -0,0 +1,150 @@
+import re
+import unicodedata
+from collections import Counter
+from languages import normalize
+
+# This module picks out the words of text pasted as running prose (e.g. a paragraph or a whole chapter), so that
+# each distinct word is looked up once instead of each line being looked up as one term.
+# Words are found with a pattern for the script of the selected language, which leaves out punctuation, numbers
+# and words in other scripts. Chinese, which is written without spaces, is split into words by looking for the
+# longest word in the local CC-CEDICT store (see chinese_cedict.py) at each position.
+
+# Letters (including combining marks such as Arabic harakat and Hebrew niqqud) of each script.
+latin_letters = 'A-Za-z\u00aa\u00b5\u00ba\u00c0-\u00d6\u00d8-\u00f6\u00f8-\u024f\u0300-\u036f\u1e00-\u1eff'
+greek_letters = '\u0370-\u0373\u0376\u0377\u037b-\u037d\u037f\u0386\u0388-\u03ff\u1f00-\u1fff\u0300-\u036f'
+arabic_letters = '\u0620-\u064a\u064b-\u065f\u0670-\u06d3\u06d5\u06e5\u06e6\u06ee\u06ef\u06fa-\u06ff'
+hebrew_letters = '\u05b0-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7\u05d0-\u05ea\u05f0-\u05f2\ufb1d-\ufb4f'
+hangul_letters = '\u1100-\u11ff\u3130-\u318f\ua960-\ua97f\uac00-\ud7af\ud7b0-\ud7ff'
+han_letters = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\U00020000-\U0002fa1f'
+
+# Characters that join two runs of letters into one word, e.g. the hyphen of "arc-en-ciel", the apostrophe of
+# "aujourd'hui" or the gershayim of Hebrew abbreviations such as צה"ל.
+latin_joiners = "'\u2019\\-\u2010\u2011"
+greek_joiners = "\\-\u2010\u2011"
+hebrew_joiners = "'\"\u05f3\u05f4\u05be\\-"
+
+
+def word_pattern(letters, joiners=None):
+    """This function compiles a pattern that matches a run of letters, with single joiners allowed inside."""
+    if joiners is None:
+        return re.compile('[' + letters + ']+')
+    return re.compile('[' + letters + ']+(?:[' + joiners + '][' + letters + ']+)*')
+
+
+latin_words = word_pattern(latin_letters, latin_joiners)
+
+# word_patterns has the pattern for the words of each language.
+word_patterns = {'Greek': word_pattern(greek_letters, greek_joiners),
+                 'Arabic': word_pattern(arabic_letters),
+                 'Hebrew': word_pattern(hebrew_letters, hebrew_joiners),
+                 'Korean': word_pattern(hangul_letters),
+                 'Chinese': word_pattern(han_letters)
+                 }
+
+# cased is the set of languages whose words are counted together regardless of capitalization.
+cased = {'Greek'}
+
+# elisions lists, for languages that drop a vowel before another word with an apostrophe (e.g. French "l'homme"),
+# the elided words. These are split off, so that "l'homme" is looked up as "homme".
+elisions = {'French': {"c", "d", "j", "l", "m", "n", "s", "t", "qu", "jusqu", "lorsqu", "puisqu", "quoiqu"},
+            'Italian': {"l", "d", "c", "m", "t", "s", "v", "un", "dell", "all", "dall", "nell", "sull", "coll",
+                        "quell", "quest", "bell", "sant"}
+            }
+
+# Arabic tatweel only stretches letters for layout, so it is removed before words are counted.
+tatweel = '\u0640'
+
+# apostrophes are the characters taken as an apostrophe when splitting off elisions.
+apostrophes = "'\u2019"
+
+
+def split_elision(word, elided):
+    """This function splits an elided word off the front of word, e.g. "l'homme" becomes "homme".
+
+    word = Word found in the text.
+    elided = Set of elided words (in lower case) of the language.
+
+    Returns the rest of the word, or word unchanged if it doesn't start with an elided word.
+    """
+    for i, c in enumerate(word):
+        if c in apostrophes:
+            if word[:i].casefold() in elided:
+                return split_elision(word[i + 1:], elided)
+            return word
+    return word
+
+
+def segment_chinese(run, store):
+    """This function splits a run of hanzi into words, taking the longest word in store at each position.
+
+    run = String of hanzi.
+    store = chinese_cedict.CedictStore, or None if CC-CEDICT hasn't been imported, in which case run is
+            returned as one word (MDBG splits phrases into words itself).
+
+    Returns a list of words. Hanzi that don't start any word in store are kept as words of one character.
+    """
+    if store is None:
+        return [run]
+    words = []
+    i = 0
+    while i < len(run):
+        length = store.longest_match(run, i)
+        words.append(run[i:i + length])
+        i += length
+    return words
+
+
+def words(text, foreign_lang):
+    """This function returns the words of text in the script of foreign_lang, in order.
+
+    Punctuation, numbers and words in other scripts are left out.
+    """
+    text = unicodedata.normalize('NFC', text)
+    if foreign_lang == 'Arabic':
+        text = text.replace(tatweel, '')
+    found = word_patterns.get(foreign_lang, latin_words).findall(text)
+
+    if foreign_lang == 'Chinese':
+        from languages import chinese_cedict
+        store = chinese_cedict.default_store()
+        output = []
+        for run in found:
+            output += segment_chinese(run, store)
+        return output
+
+    if foreign_lang in elisions:
+        elided = elisions[foreign_lang]
+        found = [split_elision(w, elided) for w in found]
+    return found
+
+
+def ranked_terms(text, foreign_lang, casefold=False, limit=None, latin=False):
+    """This function picks out the distinct words of text to look up, most frequent first.
+
+    text = Pasted text.
+    foreign_lang = Language the text is in.
+    casefold = Whether words are looked up in lower case (only for languages that use the Latin alphabet).
+               Words that only differ in capitalization are always counted together in languages that have
+               capital letters; without casefold, each is looked up in the form it appears in most often
+               (e.g. "maison" rather than "Maison" at the start of a sentence).
+    limit = Greatest number of words to return, or None for all of them.
+    latin = Whether foreign_lang uses the Latin alphabet.
+
+    Returns a list of (word, count) tuples, by decreasing count, then in order of first appearance.
+    """
+    fold = latin or foreign_lang in cased
+    counts = Counter()
+    forms = {}
+    for w in words(text, foreign_lang):
+        key = normalize.fold_case(w, foreign_lang) if fold else w
+        counts[key] += 1
+        forms.setdefault(key, Counter())[w] += 1
+
+    # Counter keeps keys in order of first appearance, and sorted() is stable, so ties keep that order.
+    ranked = sorted(counts.items(), key=lambda item: -item[1])
+    if limit is not None:
+        ranked = ranked[:limit]
+    if casefold and latin:
+        return ranked
+    # The most common form is used, and the lower-case one if two are as common.
+    return [(max(forms[key].items(), key=lambda form: (form[1], form[0].islower()))[0], n) for key, n in ranked]
@@ -0,0 +1,54 @@
+import threading
+from languages import dictionaries
+
+# This module looks terms up in the background before the user asks for them (e.g. while they are still typing
+# their list), remembering the Results in a memory.ResultMemory so that the search itself finds them there.
+
+
+class Prefetcher:
+    """Looks terms up on a background thread, one batch at a time.
+
+    Starting a new batch (e.g. because more lines were typed or the options changed) cancels the one before:
+    pages that are already being downloaded are finished and their Results remembered, while the terms that
+    haven't been sent to the website yet (including those waiting to be retried) are dropped.
+    """
+
+    def __init__(self, results_memory):
+        self.results_memory = results_memory
+
+        # stop is set to cancel the batch that is running, if there is one.
+        self.stop = None
+
+    def prefetch(self, terms, foreign_lang, dictionary, en_to_l2, strict_search):
+        """This function starts looking up the terms that aren't remembered yet, canceling the previous batch.
+
+        terms = Terms as returned by dictionaries.clean_terms(). The other parameters are as for
+        dictionaries.iter_search, and must be the ones the search will be run with for the results to be used.
+        """
+        self.cancel()
+        if len(terms) == 0:
+            return
+
+        # Terms that are already remembered are skipped by iter_search without going to the network.
+        self.stop = threading.Event()
+        args = (terms, foreign_lang, dictionary, en_to_l2, strict_search)
+        threading.Thread(target=self.run, args=(args, self.stop), daemon=True).start()
+
+    def run(self, args, stop):
+        """This function runs one batch on the background thread. Results are remembered by iter_search."""
+        lookups = dictionaries.iter_search(*args, results_memory=self.results_memory, cancel=stop)
+        try:
+            for i, term, result in lookups:
+                if stop.is_set():
+                    break
+        except Exception:
+            # A prefetch that fails is simply dropped; the search will look the terms up again and report errors.
+            pass
+        finally:
+            lookups.close()
+
+    def cancel(self):
+        """This function cancels the batch that is running, if there is one."""
+        if self.stop is not None:
+            self.stop.set()
+            self.stop = None
@@ -0,0 +1,202 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from languages import trace
+
+# This module decides when requests may be sent to each dictionary website, and retries the ones that fail.
+#
+# Every website has a token bucket (host_rates requests per second on average, up to burst at once after a
+# quiet spell) and a concurrency limit. The concurrency limit starts at the website's maximum (the host_limits
+# of the fetcher module), is halved whenever the website pushes back (429, 503, 504 or a timeout) and grows
+# back by about one request per round of successful requests (additive increase, multiplicative decrease).
+# A Retry-After header pauses every request to that website until the time it gives.
+
+# host_rates is how many requests per second may be sent to each dictionary website, on average.
+# Websites that aren't listed here (e.g. a local test server) have no rate limit.
+host_rates = {'www.wordreference.com': 8,
+              'www.arabdict.com': 8,
+              'www.morfix.co.il': 8,
+              'www.mdbg.net': 8
+              }
+
+# burst is how many requests may be sent at once after the website hasn't been used for a while.
+burst = 4
+
+# max_attempts is how many times a request is tried before the term is given up on.
+max_attempts = 5
+
+# Failed requests wait a random time between 0 and base_delay * 2 ** (attempt - 1) seconds,
+# but never more than max_delay, before being tried again. Retry-After is honored up to max_retry_after.
+base_delay = 0.5
+max_delay = 10
+max_retry_after = 60
+
+# cancel_poll is how often (in seconds) a request waiting for its turn checks whether its search was canceled.
+cancel_poll = 0.1
+
+# Statuses that mean the request may work if it's tried again, and those that mean the website is overloaded.
+retry_statuses = {429, 500, 502, 503, 504}
+pushback_statuses = {429, 503, 504}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class GaveUp(Exception):
+    """Raised when a request still failed after max_attempts tries.
+
+    url = Address that was requested.
+    reason = Short description of the last failure, e.g. "HTTP 503" or "timed out".
+    """
+
+    def __init__(self, url, reason):
+        super().__init__(reason + ": " + url)
+        self.url = url
+        self.reason = reason
+
+
+class Canceled(Exception):
+    """Raised when a request is given up on because its search was canceled."""
+
+
+class HostLimiter:
+    """The token bucket, concurrency limit and Retry-After pause of one website."""
+
+    def __init__(self, rate, max_concurrency):
+        self.rate = rate
+        self.tokens = burst
+        self.refilled = time.monotonic()
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, cancel=None):
+        """This function waits until a request may be sent, then counts it as in flight.
+
+        cancel = threading.Event that is set if the search is canceled, in which case Canceled is raised.
+        """
+        with self.condition:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise Canceled()
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if wait <= 0 and self.in_flight < int(self.concurrency):
+                    if self.rate is None:
+                        break
+                    self.tokens = min(burst, self.tokens + (now - self.refilled) * self.rate)
+                    self.refilled = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    wait = (1 - self.tokens) / self.rate
+                # Wake up when the pause or the token refill is over, or when a request finishes.
+                # A request of a search that can be canceled also wakes up to check for that.
+                if cancel is not None:
+                    wait = min(wait, cancel_poll) if wait > 0 else cancel_poll
+                self.condition.wait(wait if wait > 0 else None)
+            self.in_flight += 1
+
+    def release(self):
+        """This function counts a request as finished."""
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def success(self):
+        """This function grows the concurrency limit by about one for each full round of successful requests."""
+        with self.condition:
+            if self.concurrency < self.max_concurrency:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+                self.condition.notify_all()
+
+    def pushback(self, retry_after=None):
+        """This function halves the concurrency limit and, if retry_after is given, pauses the website."""
+        with self.condition:
+            self.concurrency = max(1.0, self.concurrency / 2)
+            if retry_after is not None:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+def limiter_for(host, max_concurrency):
+    """This function returns the limiter of host, creating it with max_concurrency if needed."""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = HostLimiter(host_rates.get(host), max_concurrency)
+        return _limiters[host]
+
+
+def retry_after_seconds(value):
+    """This function converts a Retry-After header (seconds or an HTTP date) into seconds, or None if invalid."""
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max_retry_after, max(0.0, seconds))
+
+
+def backoff_delay(attempt):
+    """This function returns how long to wait before trying again after the given failed attempt (from 1)."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+def request(host, max_concurrency, fetch, *args, cancel=None):
+    """This function calls fetch(*args) to download a page from host, when host's limits allow it.
+
+    Requests that fail with a status in retry_statuses, a timeout or a connection error are tried again
+    after a delay, up to max_attempts times. Returns the response, or raises GaveUp if every attempt failed.
+    Other statuses (e.g. 404) are returned as they are, since the dictionary modules handle them.
+
+    cancel = threading.Event that is set if the search is canceled. It is checked before each attempt and
+             interrupts the waits between them, raising Canceled. A download that has started is not interrupted.
+    """
+    limiter = limiter_for(host, max_concurrency)
+    attempt = 1
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise Canceled()
+        start = time.perf_counter()
+        limiter.acquire(cancel)
+        trace.record('throttle', start)
+        try:
+            r = fetch(*args)
+        except requests.Timeout as e:
+            limiter.pushback()
+            failure = (e, "timed out", None)
+        except requests.ConnectionError as e:
+            failure = (e, "could not connect", None)
+        else:
+            if r.status_code not in retry_statuses:
+                limiter.success()
+                return r
+            retry_after = retry_after_seconds(r.headers.get('Retry-After'))
+            if r.status_code in pushback_statuses:
+                limiter.pushback(retry_after)
+            failure = (r, "HTTP " + str(r.status_code), retry_after)
+        finally:
+            limiter.release()
+
+        if attempt >= max_attempts:
+            source, reason, retry_after = failure
+            if isinstance(source, Exception):
+                url = source.request.url if source.request is not None else ''
+            else:
+                url = source.url
+            raise GaveUp(url, reason)
+
+        retry_after = failure[2]
+        delay = retry_after if retry_after is not None else backoff_delay(attempt)
+        if cancel is None:
+            time.sleep(delay)
+        elif cancel.wait(delay):
+            raise Canceled()
+        attempt += 1
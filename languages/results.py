@@ -0,0 +1,172 @@
+import time
+from languages import trace
+
+# These classes hold the search results extracted by the modules in the languages folder.
+# They use __slots__ so that large batches of results stay small in memory,
+# and results are only compiled into text when render() is called (i.e. when a result is displayed).
+
+
+class Translation:
+    """A target-language word and its clarifying information (None if the dictionary doesn't give any)."""
+    __slots__ = ('word', 'add')
+
+    def __init__(self, word, add=None):
+        self.word = word
+        self.add = add
+
+    def as_dict(self):
+        return {'word': self.word, 'add': self.add}
+
+
+class Entry:
+    """A dictionary entry: a source-language word, its translations and example sentences.
+
+    l1 = Source-language word.
+    l1_add = Clarifying information for l1, or None if there isn't any.
+    l2 = List of Translations.
+    l1_ex, l2_ex = Lists of example sentences in the source and target language.
+    """
+    __slots__ = ('l1', 'l1_add', 'l2', 'l1_ex', 'l2_ex')
+
+    def __init__(self, l1=None, l1_add=None):
+        self.l1 = l1
+        self.l1_add = l1_add
+        self.l2 = []
+        self.l1_ex = []
+        self.l2_ex = []
+
+    def as_dict(self):
+        return {'l1': self.l1,
+                'l1_add': self.l1_add,
+                'l2': [t.as_dict() for t in self.l2],
+                'l1_ex': self.l1_ex,
+                'l2_ex': self.l2_ex
+                }
+
+
+class ChineseEntry:
+    """A Chinese dictionary entry.
+
+    simp = Simplified hanzi, or the only hanzi if simplified and traditional are the same.
+    trad = Traditional hanzi, or None if it is the same as simp.
+    piny = Pinyin pronunciation.
+    defs = Definitions.
+    """
+    __slots__ = ('simp', 'trad', 'piny', 'defs')
+
+    def __init__(self, simp, trad, piny, defs):
+        self.simp = simp
+        self.trad = trad
+        self.piny = piny
+        self.defs = defs
+
+    def as_dict(self):
+        return {'simp': self.simp, 'trad': self.trad, 'piny': self.piny, 'defs': self.defs}
+
+
+def print_chinese_entry(w, pair=None):
+    """This function converts ChineseEntry w into a formatted string. pair is unused.
+
+    It is shared by the MDBG and CC-CEDICT modules, which both return ChineseEntries.
+    """
+    entry = ["Chinese:\n"]
+    if w.trad is None:
+        entry += ["  Hanzi: ", w.simp, '\n']
+    else:
+        entry += ["  Simplified: ", w.simp, '\n']
+        entry += ["  Traditional: ", w.trad, '\n']
+    entry += ["  Pinyin: ", w.piny, '\n']
+    entry += ["  Definition: ", w.defs, '\n\n']
+    return ''.join(entry)
+
+
+class Result:
+    """The search results for one term.
+
+    term = Term that was looked up.
+    source = Name of the dictionary, e.g. "WordReference".
+    url = Address of the page the results came from.
+    entries = List of Entry or ChineseEntry objects.
+    pair = Language pair of the page as the dictionary module names it (e.g. "enfr" or "heToen"), or None.
+    render_entry = The dictionary module's function that compiles an entry into text, given the entry and pair.
+    error = The dictionary module's function that compiles the error message, given the term and url,
+            or None if results were found.
+    """
+    __slots__ = ('term', 'source', 'url', 'entries', 'pair', 'render_entry', 'error')
+
+    def __init__(self, term, source, url, entries, pair, render_entry, error=None):
+        self.term = term
+        self.source = source
+        self.url = url
+        self.entries = entries
+        self.pair = pair
+        self.render_entry = render_entry
+        self.error = error
+
+    def found(self):
+        """This function returns whether the dictionary had results for the term."""
+        return self.error is None
+
+    def render(self):
+        """This function compiles the results (or the error message) into the text shown to the user."""
+        start = time.perf_counter()
+        if self.error is not None:
+            text = self.error(self.term, self.url)
+        else:
+            parts = [self.render_entry(e, self.pair) for e in self.entries]
+            parts.append("\nSource:\n" + self.url)
+            text = ''.join(parts)
+        trace.report(self.term, self.source, 'render', start)
+        return text
+
+    def as_dict(self):
+        """This function returns the result as plain dictionaries and lists, e.g. for writing it as JSON."""
+        error = None
+        if self.error is not None:
+            error = self.error(self.term, self.url)
+        return {'term': self.term,
+                'source': self.source,
+                'url': self.url,
+                'found': self.found(),
+                'pair': self.pair,
+                'entries': [e.as_dict() for e in self.entries],
+                'error': error
+                }
+
+
+class MergedResult:
+    """The search results for one term from several dictionaries, shown together and labelled by dictionary.
+
+    term = Term that was looked up.
+    results = List of Results, one per dictionary.
+    """
+    __slots__ = ('term', 'results', 'source')
+
+    def __init__(self, term, results):
+        self.term = term
+        self.results = results
+        self.source = ", ".join(r.source for r in results)
+
+    def found(self):
+        """This function returns whether any of the dictionaries had results for the term."""
+        return any(r.found() for r in self.results)
+
+    def render(self):
+        """This function compiles every dictionary's results into one text, each under the dictionary's name."""
+        parts = []
+        for r in self.results:
+            parts += ["=== ", r.source, " ===\n", r.render(), "\n\n"]
+        return ''.join(parts).rstrip('\n')
+
+    def as_dict(self):
+        """This function returns the results as plain dictionaries and lists, one per dictionary under 'results'."""
+        return {'term': self.term,
+                'source': self.source,
+                'found': self.found(),
+                'results': [r.as_dict() for r in self.results]
+                }
+
+
+def error_result(term, source, url, error):
+    """This function returns a Result for a term that had no results. error is as for Result."""
+    return Result(term, source, url, [], None, None, error)
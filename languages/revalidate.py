@@ -0,0 +1,74 @@
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+# This module decides how pages in the lookup cache are refreshed once they are older than cache.ttl.
+#
+# Dictionary pages rarely change. When a website sends validators with a page (an ETag or a Last-Modified
+# header), they are kept in the cache with it, and a stale page can be refreshed with a conditional request
+# (If-None-Match / If-Modified-Since). If the page hasn't changed, the website answers 304 Not Modified with
+# headers only, and the cached page is used again for another cache.ttl.
+
+# The revalidation policies:
+# stale = Pages are used from the cache until they are older than cache.ttl, then revalidated.
+# always = Every lookup revalidates the cached page, so changes on the website are seen at once.
+# never = Stale pages are downloaded again in full, e.g. for a website whose validators can't be trusted.
+STALE = 'stale'
+ALWAYS = 'always'
+NEVER = 'never'
+
+# host_policies is the revalidation policy of each dictionary website. Websites that aren't listed here
+# use default_policy.
+host_policies = {'www.wordreference.com': STALE,
+                 'www.arabdict.com': STALE,
+                 'www.morfix.co.il': STALE,
+                 'www.mdbg.net': STALE
+                 }
+default_policy = STALE
+
+# Validators are the headers a page was served with that a conditional request sends back.
+# etag and last_modified are None if the website didn't send them.
+Validators = namedtuple('Validators', ['etag', 'last_modified'])
+
+_local = threading.local()
+
+
+def policy_for(host):
+    """This function returns the revalidation policy of host."""
+    return host_policies.get(host, default_policy)
+
+
+def validators_of(r):
+    """This function returns the Validators of response r, or None if it has none."""
+    etag = r.headers.get('ETag')
+    last_modified = r.headers.get('Last-Modified')
+    if etag is None and last_modified is None:
+        return None
+    return Validators(etag, last_modified)
+
+
+@contextmanager
+def conditional(validators):
+    """This function makes the requests sent on this thread inside the with block conditional on validators.
+
+    The dictionary modules' fetch functions don't know about the cache, so the validators are passed to
+    sessions.get() this way rather than through them. validators may be None, for unconditional requests.
+    """
+    _local.validators = validators
+    try:
+        yield
+    finally:
+        _local.validators = None
+
+
+def conditional_headers():
+    """This function returns the conditional request headers for the page being fetched on this thread, or None."""
+    validators = getattr(_local, 'validators', None)
+    if validators is None:
+        return None
+    headers = {}
+    if validators.etag is not None:
+        headers['If-None-Match'] = validators.etag
+    if validators.last_modified is not None:
+        headers['If-Modified-Since'] = validators.last_modified
+    return headers
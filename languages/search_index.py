@@ -0,0 +1,214 @@
+"""Search the contents of looked-up results, e.g. for the terms that had "house" in a translation.
+
+A ResultIndex is an inverted index: for every word in the results, the results (by index in the searched terms)
+it appears in, field by field. Results are added as they arrive, and queries only touch the words they ask for.
+
+Queries are words separated by spaces, all of which must match. Capitalization and accents are ignored, so
+"maison" finds "Maison" and "ni hao" finds "nǐ hǎo".
+    house              Results with "house" in any field.
+    hous*              Results with a word starting with "hous".
+    translation:house  Results with "house" in a translation (or another field, see fields).
+    has:example        Results with at least one example sentence (or another field).
+
+An index can be saved with save() and read back with load(). The command line's --index writes the index of
+a batch to a file, which can then be searched with:
+    python -m languages.search_index index.json.gz "translation:house"
+"""
+import gzip
+import json
+import re
+import sys
+import unicodedata
+from bisect import bisect_left
+
+# fields are the parts of a result that are indexed:
+# headword = Word looked up on the dictionary, simplified and traditional hanzi for Chinese.
+# translation = Translations, definitions for Chinese.
+# clarifier = Clarifying information of headwords and translations.
+# example = Example sentences in either language.
+# pinyin = Pinyin of Chinese entries.
+fields = ['headword', 'translation', 'clarifier', 'example', 'pinyin']
+
+# format_version is written in saved indexes, so that older ones can be recognized if the format changes.
+format_version = 1
+
+# A word is a run of letters or of digits. Hanzi are indexed one by one, as Chinese doesn't separate words.
+word_pattern = re.compile(r'[^\W\d_]+|\d+')
+han_pattern = re.compile('([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff])')
+
+
+def fold(text):
+    """This function puts text in the form words are indexed and queried in: lower case, without accents."""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFD', text.casefold())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def words(text):
+    """This function returns the folded words of text."""
+    if not text:
+        return []
+    output = []
+    for w in word_pattern.findall(fold(text)):
+        if han_pattern.search(w):
+            output += [part for part in han_pattern.split(w) if part != '']
+        else:
+            output.append(w)
+    return output
+
+
+def entry_fields(entry):
+    """This function yields (field, text) for each piece of text in an Entry or ChineseEntry."""
+    if hasattr(entry, 'piny'):
+        yield 'headword', entry.simp
+        yield 'headword', entry.trad
+        yield 'pinyin', entry.piny
+        yield 'translation', entry.defs
+        return
+    yield 'headword', entry.l1
+    yield 'clarifier', entry.l1_add
+    for t in entry.l2:
+        yield 'translation', t.word
+        yield 'clarifier', t.add
+    for x in entry.l1_ex:
+        yield 'example', x
+    for x in entry.l2_ex:
+        yield 'example', x
+
+
+def result_entries(result):
+    """This function returns the entries of a Result, or of every dictionary's Result for a MergedResult."""
+    if hasattr(result, 'results'):
+        entries = []
+        for r in result.results:
+            entries += r.entries
+        return entries
+    return result.entries
+
+
+class ResultIndex:
+    """An inverted index over the fields of a batch of results.
+
+    postings maps each word to a dictionary of field to the set of result indices it appears in that field.
+    with_field maps each field to the set of result indices that have any text in that field.
+    terms maps each result index to the term that was looked up.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.with_field = {f: set() for f in fields}
+        self.terms = {}
+
+        # sorted_words is the sorted list of words for prefix queries, made when needed. None when out of date.
+        self.sorted_words = None
+
+    def add(self, i, result):
+        """This function indexes result as the result of the term at index i."""
+        self.terms[i] = result.term
+        for entry in result_entries(result):
+            for field, text in entry_fields(entry):
+                found = words(text)
+                if len(found) == 0:
+                    continue
+                self.with_field[field].add(i)
+                for w in found:
+                    by_field = self.postings.get(w)
+                    if by_field is None:
+                        by_field = self.postings[w] = {}
+                        self.sorted_words = None
+                    if field in by_field:
+                        by_field[field].add(i)
+                    else:
+                        by_field[field] = {i}
+
+    def matches(self, w, field=None):
+        """This function returns the set of result indices that have the folded word w (in field, if given)."""
+        by_field = self.postings.get(w)
+        if by_field is None:
+            return set()
+        if field is not None:
+            return by_field.get(field, set())
+        if len(by_field) == 1:
+            return next(iter(by_field.values()))
+        return set().union(*by_field.values())
+
+    def prefix_matches(self, prefix, field=None):
+        """This function returns the set of result indices that have a word starting with prefix (in field)."""
+        if self.sorted_words is None:
+            self.sorted_words = sorted(self.postings)
+        found = set()
+        for n in range(bisect_left(self.sorted_words, prefix), len(self.sorted_words)):
+            w = self.sorted_words[n]
+            if not w.startswith(prefix):
+                break
+            found |= self.matches(w, field)
+        return found
+
+    def query(self, text):
+        """This function returns the sorted list of result indices that match the query text (see above)."""
+        sets = []
+        for part in text.split():
+            field = None
+            if ':' in part:
+                name, part = part.split(':', 1)
+                name = name.casefold()
+                if name == 'has':
+                    sets.append(self.with_field.get(fold(part), set()))
+                    continue
+                if name not in fields:
+                    return []
+                field = name
+
+            # Only the last word of a part ending in * is a prefix, e.g. the "ho" of "chez-ho*".
+            found = words(part)
+            for n, w in enumerate(found):
+                if part.endswith('*') and n == len(found) - 1:
+                    sets.append(self.prefix_matches(w, field))
+                else:
+                    sets.append(self.matches(w, field))
+
+        if len(sets) == 0:
+            return []
+        # Intersecting from the smallest set keeps queries quick even when they include common words.
+        sets.sort(key=len)
+        found = set(sets[0])
+        for s in sets[1:]:
+            found &= s
+            if len(found) == 0:
+                break
+        return sorted(found)
+
+    def save(self, path):
+        """This function writes the index to path as gzip-compressed JSON."""
+        data = {'version': format_version,
+                'terms': self.terms,
+                'postings': {w: {f: sorted(ids) for f, ids in by_field.items()}
+                             for w, by_field in self.postings.items()},
+                'with_field': {f: sorted(ids) for f, ids in self.with_field.items()}
+                }
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        """This function reads an index written by save()."""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != format_version:
+            raise ValueError(path + " is not a result index this version can read.")
+        index = cls()
+        index.terms = {int(i): term for i, term in data['terms'].items()}
+        index.postings = {w: {f: set(ids) for f, ids in by_field.items()} for w, by_field in data['postings'].items()}
+        for f, ids in data['with_field'].items():
+            index.with_field[f] = set(ids)
+        return index
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('Usage: python -m languages.search_index INDEX_FILE "QUERY"')
+        sys.exit(2)
+    index = ResultIndex.load(sys.argv[1])
+    for i in index.query(sys.argv[2]):
+        print(str(i) + "\t" + index.terms[i])
@@ -0,0 +1,111 @@
+import atexit
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.request import ACCEPT_ENCODING
+from languages import fetcher, revalidate, trace
+
+# Every dictionary website gets one requests.Session that lasts for the whole application,
+# so connections (and their TLS handshakes) are reused from term to term and from search to search.
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# timeout is how many seconds to wait for a dictionary website before giving up on a request.
+timeout = 10
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """An HTTP connection that records how long connecting took in the trace of the term being looked up."""
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        trace.record('connect', start)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """An HTTPS connection that records how long connecting (including the TLS handshake) took."""
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        trace.record('connect', start)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    """An HTTPAdapter whose connections are timed for the trace module."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                   'https': TimedHTTPSConnectionPool}
+
+
+def new_session(host):
+    """This function creates a session for host, with a connection pool sized to its concurrency limit."""
+    pool_size = fetcher.host_limits.get(host, fetcher.default_limit)
+
+    # Requests aren't retried here: the ratelimit module retries them, so that it can also slow down
+    # every other request to a website that is failing.
+    session = requests.Session()
+    adapter = TimedAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    # Ask for compressed pages using every encoding urllib3 can decode here (gzip and deflate, plus brotli
+    # and zstd if their packages are installed). Dictionary pages are mostly text and compress very well.
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    return session
+
+
+def session_for(host):
+    """This function returns the session for host, creating it on first use."""
+    with _sessions_lock:
+        if host not in _sessions:
+            _sessions[host] = new_session(host)
+        return _sessions[host]
+
+
+def get(url, params=None):
+    """This function downloads url using the shared session for its website.
+
+    Returns the requests.Response.
+    The response headers and the body are read separately, so the trace module can time them separately.
+    If the page is being revalidated (see revalidate.conditional()), the request is conditional, and the
+    response may be 304 Not Modified with no body.
+    """
+    start = time.perf_counter()
+    r = session_for(fetcher.host_of(url)).get(url, params=params, timeout=timeout, stream=True,
+                                              headers=revalidate.conditional_headers())
+    trace.record('ttfb', start)
+
+    start = time.perf_counter()
+    r.content
+    trace.record('download', start)
+
+    t = trace.current()
+    if t is not None:
+        t.bytes += r.raw.tell() or len(r.content)
+    return r
+
+
+def close_all():
+    """This function closes every session and its pooled connections."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+atexit.register(close_all)
@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# This module times the steps of looking up each term, so a slow batch can be narrowed down to the network,
+# the website or the program itself.
+#
+# Each term's lookup is recorded in a TermTrace, made up of spans:
+# queue = Waiting for a worker thread.
+# cache = Looking the page up in the lookup cache.
+# throttle = Waiting for the website's rate and concurrency limits (see ratelimit.py), once per attempt.
+# connect = Opening a new connection, including DNS and the TLS handshake. Reused connections have none.
+# ttfb = From sending the request until the response headers arrive (includes connect, if there is one).
+# download = Reading the body of the page.
+# parse = Turning the HTML into a tree (BeautifulSoup or lxml). With fetcher.parse_workers set, the tree is made
+#         in a worker process, where nothing is recorded, so parse is instead the whole round trip to the worker:
+#         sending the page, parsing and extracting it there, and sending the Result back.
+# extract = The dictionary module's whole parse() function, i.e. parse plus reading the results from the tree.
+# render = Compiling a result into the text shown to the user. This is recorded on its own, when it happens.
+#
+# Nothing is recorded unless a hook has been added with add_hook(). A hook is called with each finished
+# TermTrace, from the thread that did the lookup. Recorder is a hook that keeps the traces for a summary
+# or a Chrome trace file (open it in chrome://tracing or https://ui.perfetto.dev).
+
+# Settings read from the environment, used by the window after each search:
+# export_path = If set, the Chrome trace of each search is written to this file.
+# ticker_summary = If True, a summary of the timings is shown on the ticker page while searching.
+export_path = os.environ.get('VOCABSEARCHER_TRACE') or None
+ticker_summary = os.environ.get('VOCABSEARCHER_TRACE_SUMMARY', '') not in ('', '0')
+
+# Span names in the order they happen, for summaries.
+span_names = ['queue', 'cache', 'throttle', 'connect', 'ttfb', 'download', 'parse', 'extract', 'render']
+
+hooks = []
+_hooks_lock = threading.Lock()
+_local = threading.local()
+
+
+class TermTrace:
+    """The timings of one term's lookup.
+
+    term, source = The term and the dictionary it was looked up on.
+    thread = Identifier of the thread that did the lookup.
+    spans = List of (name, start, end), in seconds of time.perf_counter().
+    bytes = Bytes of the page received over the network (compressed, if the website compressed it), or 0.
+    cache = 'hit', 'miss', 'revalidated' (the website said the cached page hasn't changed) or None if the lookup
+            cache wasn't used.
+    """
+    __slots__ = ('term', 'source', 'thread', 'spans', 'bytes', 'cache')
+
+    def __init__(self, term, source):
+        self.term = term
+        self.source = source
+        self.thread = threading.get_ident()
+        self.spans = []
+        self.bytes = 0
+        self.cache = None
+
+    def add(self, name, start, end):
+        self.spans.append((name, start, end))
+
+    def duration(self, name):
+        """This function returns the total seconds spent in spans called name."""
+        return sum(end - start for n, start, end in self.spans if n == name)
+
+
+def add_hook(hook):
+    """This function starts calling hook with each finished TermTrace."""
+    with _hooks_lock:
+        hooks.append(hook)
+
+
+def remove_hook(hook):
+    """This function stops calling hook."""
+    with _hooks_lock:
+        if hook in hooks:
+            hooks.remove(hook)
+
+
+def active():
+    """This function returns whether any hook wants traces."""
+    return len(hooks) > 0
+
+
+def emit(t):
+    """This function passes a finished TermTrace to every hook."""
+    for hook in list(hooks):
+        hook(t)
+
+
+def begin(term, source, queued=None):
+    """This function starts tracing the lookup of term on the calling thread.
+
+    queued = time.perf_counter() when the term was handed to the worker threads, to record the queue span.
+    Returns the TermTrace, or None if no hook is listening.
+    """
+    if not active():
+        return None
+    t = TermTrace(term, source)
+    if queued is not None:
+        t.add('queue', queued, time.perf_counter())
+    _local.trace = t
+    return t
+
+
+def end(t):
+    """This function finishes the trace returned by begin() and passes it to the hooks."""
+    if t is None:
+        return
+    _local.trace = None
+    emit(t)
+
+
+def current():
+    """This function returns the TermTrace being recorded on the calling thread, or None."""
+    return getattr(_local, 'trace', None)
+
+
+def record(name, start, end=None):
+    """This function adds a span to the calling thread's trace, if there is one. end defaults to now."""
+    t = current()
+    if t is not None:
+        t.add(name, start, time.perf_counter() if end is None else end)
+
+
+@contextmanager
+def span(name):
+    """This function records the code run inside a with statement as a span of the calling thread's trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, start)
+
+
+def report(term, source, name, start):
+    """This function records a span that isn't part of a lookup (e.g. render) as a trace of its own."""
+    if not active():
+        return
+    t = TermTrace(term, source)
+    t.add(name, start, time.perf_counter())
+    emit(t)
+
+
+class Recorder:
+    """A hook that keeps every TermTrace it is given, to summarize them or save them as a Chrome trace."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.traces = []
+        self.lock = threading.Lock()
+
+        # Running totals for summary(), updated as each trace arrives so that a summary takes the same time
+        # however many traces there are (the ticker asks for one after every term).
+        # span_totals and span_counts = Seconds spent in each span and number of traces that have it.
+        # lookups_count, total_bytes, hits, revalidated = Over the traces of lookups (see is_lookup()).
+        self.span_totals = {}
+        self.span_counts = {}
+        self.lookups_count = 0
+        self.total_bytes = 0
+        self.hits = 0
+        self.revalidated = 0
+
+    @staticmethod
+    def is_lookup(t):
+        """This function returns whether t is the trace of a lookup, rather than one only recording render."""
+        return not (len(t.spans) == 1 and t.spans[0][0] == 'render')
+
+    def __call__(self, t):
+        durations = {}
+        for name, start, end in t.spans:
+            durations[name] = durations.get(name, 0) + end - start
+        with self.lock:
+            self.traces.append(t)
+            for name, seconds in durations.items():
+                self.span_totals[name] = self.span_totals.get(name, 0) + seconds
+                self.span_counts[name] = self.span_counts.get(name, 0) + 1
+            if self.is_lookup(t):
+                self.lookups_count += 1
+                self.total_bytes += t.bytes
+                if t.cache == 'hit':
+                    self.hits += 1
+                elif t.cache == 'revalidated':
+                    self.revalidated += 1
+
+    def lookups(self):
+        """This function returns the traces of lookups (i.e. leaving out those only recording render)."""
+        with self.lock:
+            return [t for t in self.traces if self.is_lookup(t)]
+
+    def summary(self):
+        """This function returns a one-line summary: average milliseconds per span, bytes and cache hits."""
+        with self.lock:
+            if self.lookups_count == 0:
+                return "No timings yet."
+            parts = []
+            for name in span_names:
+                if name in self.span_counts:
+                    average = self.span_totals[name] / self.span_counts[name]
+                    parts.append(name + " " + str(round(average * 1000, 1)) + " ms")
+            text = ("Average per term: " + ", ".join(parts) + ". " + str(round(self.total_bytes / 1024)) +
+                    " KiB downloaded, " + str(self.hits) + "/" + str(self.lookups_count) + " from cache")
+            if self.revalidated > 0:
+                text += ", " + str(self.revalidated) + " revalidated"
+        return text + "."
+
+    def chrome_trace(self):
+        """This function returns the traces in Chrome's trace event format, as a dictionary."""
+        pid = os.getpid()
+        events = []
+        with self.lock:
+            traces = list(self.traces)
+        for t in traces:
+            for name, start, end in t.spans:
+                events.append({'name': name,
+                               'cat': t.source,
+                               'ph': 'X',
+                               'ts': (start - self.origin) * 1e6,
+                               'dur': (end - start) * 1e6,
+                               'pid': pid,
+                               'tid': t.thread,
+                               'args': {'term': t.term, 'bytes': t.bytes, 'cache': t.cache}
+                               })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        """This function writes the Chrome trace to path."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
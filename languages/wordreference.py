@@ -1,6 +1,11 @@
-import requests
+from functools import partial
 from bs4 import BeautifulSoup
-from languages import language_terms
+from lxml import etree, html
+from languages import fetcher, language_terms, sessions, trace
+from languages.results import Entry, Translation, Result, error_result
+
+# base_url is the address that the language pair and term are appended to in order to look them up.
+base_url = "https://www.wordreference.com/"
 
 
 def print_entry(w, languagepair):
@@ -9,47 +14,46 @@ def print_entry(w, languagepair):
     w = Entry to be compiled.
     languagepair = Pair of languages, abbreviated as four-letter combination. (e.g. enfr = English-French)
     """
-    # Get l1 and l2 by searching keys in LanguageTerms l_terms by values from abbreviations.
-    l1 = list(language_terms.l_terms.keys())[list(language_terms.l_terms.values()).index(languagepair[0:2])]
-    l2 = list(language_terms.l_terms.keys())[list(language_terms.l_terms.values()).index(languagepair[2:4])]
+    # Get l1 and l2 from the abbreviations.
+    l1 = language_terms.code_names[languagepair[0:2]]
+    l2 = language_terms.code_names[languagepair[2:4]]
 
     # Add l1 and its additional information if it exists.
-    entry = l1 + ":\n"
-    entry += "  " + w['l1']
-    if 'l1_add' in w:
-        entry += " " + w['l1_add']
-    entry += "\n"
+    entry = [l1, ":\n", "  ", w.l1]
+    if w.l1_add is not None:
+        entry += [" ", w.l1_add]
+    entry.append("\n")
 
     # Add all l2 entries.
-    entry += l2 + ":\n"
-    for e in w['l2']:
-        entry += "  " + e['word']
-        if 'add' in e:
-            entry += " " + e['add']
-        entry += '\n'
+    entry += [l2, ":\n"]
+    for e in w.l2:
+        entry += ["  ", e.word]
+        if e.add is not None:
+            entry += [" ", e.add]
+        entry.append('\n')
 
     # Iterate through l1 example sentences if they exist.
-    if len(w['l1_ex']) > 0:
-        if len(w['l1_ex']) > 1:
+    if len(w.l1_ex) > 0:
+        if len(w.l1_ex) > 1:
             plural_marker = 's'
         else:
             plural_marker = ''
-        entry += ("Example sentence" + plural_marker + " in " + l1 + ":\n")
-        for x in w['l1_ex']:
-            entry += "  " + x + '\n'
+        entry += ["Example sentence", plural_marker, " in ", l1, ":\n"]
+        for x in w.l1_ex:
+            entry += ["  ", x, '\n']
 
     # Iterate through l2 example sentences if they exist.
-    if len(w['l2_ex']) > 0:
-        if len(w['l2_ex']) > 1:
+    if len(w.l2_ex) > 0:
+        if len(w.l2_ex) > 1:
             plural_marker = 's'
         else:
             plural_marker = ''
-        entry += ("Example sentence" + plural_marker + " in " + l2 + ":\n")
-    for x in w['l2_ex']:
-        entry += "  " + x + '\n'
+        entry += ["Example sentence", plural_marker, " in ", l2, ":\n"]
+    for x in w.l2_ex:
+        entry += ["  ", x, '\n']
 
-    entry += "\n"
-    return entry
+    entry.append("\n")
+    return ''.join(entry)
 
 
 def print_error(term, url):
@@ -63,184 +67,285 @@ def order_error(term, url):
 
 
 def new_entry():
-    """This function creates and returns an empty dictionary for search results with l2, l1_ex and l2_ex initialized."""
-    return {'l2': [], 'l1_ex': [], 'l2_ex': []}
+    """This function creates and returns an empty Entry for search results with l2, l1_ex and l2_ex initialized."""
+    return Entry()
 
 
-def search(terms, language_pair, strict_search, ticker):
-    """This function looks up terms on WordReference, extracts search results and compiles list of results.
+def fetch(term, l_term):
+    """This function downloads the WordReference page for term.
 
-    terms = Terms to be looked up.
-    language_pair = List of to and from languages to be looked up.
+    l_term = Ending of the URL address for the language pair, as returned by url_ending().
+    """
+    return sessions.get(base_url + l_term + term)
+
+
+def class_token(name):
+    """This function returns an XPath condition matching elements that have name as one of their classes."""
+    return "contains(concat(' ', normalize-space(@class), ' '), ' " + name + " ')"
+
+
+# Precompiled XPath queries used by read_page_lxml, matching what read_page_soup finds with BeautifulSoup.
+no_trans_xpath = etree.XPath("//*[@id='noTransFound']")
+header_xpath = etree.XPath("//tr[" + class_token('langHeader') + "]")
+rows_xpath = etree.XPath("//tr[" + class_token('odd') + " or " + class_token('even') + "]")
+
+# parser chooses how pages are read: 'lxml' (faster) or 'soup' (BeautifulSoup). Both give identical results.
+parser = 'lxml'
+
+
+def read_page_soup(text):
+    """This function reads a WordReference page with BeautifulSoup. See read_page_lxml for what it returns."""
+    with trace.span('parse'):
+        soup = BeautifulSoup(text, "lxml")
+
+    # Determine whether page has valid search results.
+    if len(soup.find_all(id='noTransFound')) > 0:
+        return True, None, []
+
+    # Read the language names in the header, if there is one.
+    header = soup.find('tr', class_='langHeader')
+    labels = None
+    if header is not None:
+        labels = [c.text for c in header]
+
+    # Read the cells of each row of search results.
+    rows = []
+    for i in soup.findAll('tr', class_=['odd', 'even']):
+        cells = []
+        for n in i.children:
+            if n.name is not None:
+                cl = n.attrs.get('class')
+                dsenses = None
+                if cl is None:
+                    dsenses = [c.text for c in n.children if c.name is not None and c.attrs.get('class') == ['dsense']]
+                cells.append((cl, n.text, dsenses))
+        rows.append(cells)
+    return False, labels, rows
+
+
+def element_class(element):
+    """This function returns the classes of an lxml element as a list, or None if it has no class attribute."""
+    cl = element.get('class')
+    if cl is None:
+        return None
+    return cl.split()
+
+
+def read_page_lxml(text):
+    """This function reads a WordReference page with lxml and precompiled XPath queries.
+
+    Only the header and result rows are visited, rather than building a BeautifulSoup tree for the whole page.
+
+    Returns a tuple:
+    whether the page says no translation was found,
+    the texts of the header's children (None if there is no header),
+    and a list of rows, each a list of (class list or None, text, texts of dsense children) for its cells.
+    The dsense texts are only read for unclassed cells, as that's the only place they are used.
+    """
+    # lxml refuses str input that declares its own encoding, so hand it bytes and tell it the encoding.
+    with trace.span('parse'):
+        document = html.document_fromstring(text.encode('utf-8'), parser=html.HTMLParser(encoding='utf-8'))
+
+    # Determine whether page has valid search results.
+    if len(no_trans_xpath(document)) > 0:
+        return True, None, []
+
+    # Read the language names in the header, if there is one.
+    # Like iterating over a BeautifulSoup tag, this includes the text between the header's cells.
+    headers = header_xpath(document)
+    labels = None
+    if len(headers) > 0:
+        header = headers[0]
+        labels = []
+        if header.text is not None:
+            labels.append(header.text)
+        for c in header:
+            if isinstance(c.tag, str):
+                labels.append(c.text_content())
+            if c.tail is not None:
+                labels.append(c.tail)
+
+    # Read the cells of each row of search results. Comments are skipped, as they are by BeautifulSoup's .name check.
+    rows = []
+    for i in rows_xpath(document):
+        cells = []
+        for n in i:
+            if isinstance(n.tag, str):
+                cl = element_class(n)
+                dsenses = None
+                if cl is None:
+                    dsenses = [c.text_content() for c in n if isinstance(c.tag, str) and element_class(c) == ['dsense']]
+                cells.append((cl, n.text_content(), dsenses))
+        rows.append(cells)
+    return False, labels, rows
+
+
+def parse(term, r, pair_info, strict_search):
+    """This function extracts the search results for term from its downloaded WordReference page r.
+
+    pair_info = The LanguagePair (see language_terms.py) of the language pair, as returned by url_ending().
     strict_search = If reverse-order results should be disallowed if correct-order results don't exist.
-    ticker = The window that has a ticker page to update user on progress.
 
-    Returns a list of search results and/or error messages compiled into strings.
+    Returns a Result.
+    """
+    if parser == 'lxml':
+        no_translation, labels, entries = read_page_lxml(r.text)
+    else:
+        no_translation, labels, entries = read_page_soup(r.text)
+
+    # Determine whether page has valid search results.
+    if no_translation:
+        return error_result(term, "WordReference", r.url, print_error)
+
+    # Declare empty list for definitions.
+    defs = []
+
+    # Declare empty entry.
+    entry = new_entry()
+
+    # after_frwrd is used because on WordReference, additional info added to clarify the meaning
+    # of the source word is added in an unclassed element immediately after the word.
+    # after_frwrd is set to True after FrWrd, to False after anything else.
+    after_frwrd = False
+
+    # first_entry is used to prevent an empty entry at first FrWrd.
+    first_entry = True
+
+    # A string to hold the language pair for this specific search result's website.
+    # This will be changed as the function checks the language pair in the header.
+    pair = ''
+
+    # If the header finds the langauges in the wrong order (i.e. opposite of language_pair passed to this
+    # function, then this will be set to True.
+    wrong_order = False
+
+    # Determine the language pair order by iterating through elements of the header on the website.
+    if labels is not None:
+        for c in labels:
+            code = pair_info.header_codes.get(c)
+            if code is not None:
+                pair += code
+        # If search results have language pair in wrong order and strict_search is set to True.
+        if pair != pair_info.codes and strict_search:
+            wrong_order = True
+        else:
+            # Iterate through search results for each term.
+            for i in entries:
+                to2 = ''
+                for cl, text, dsenses in i:
+                    # FrWrd is class used for words in left column (the source language).
+                    # If first entry, set first_entry to false.
+                    # Otherwise, add previous entry to definitions and start new entry.
+                    # after_frwrd is set to True as this element may be followed by additional info.
+                    if cl == ['FrWrd']:
+                        if first_entry:
+                            first_entry = False
+                        else:
+                            defs.append(entry)
+                            entry = new_entry()
+
+                        entry.l1 = text
+                        after_frwrd = True
+
+                    # If both class is None and after_frwrd is True, this means it's
+                    # clarifying information after source language word.
+                    elif cl is None and after_frwrd:
+                        fr2 = text
+
+                        # On WordReference, if both source language and target language have
+                        # clarifying info, these are bundled into one element.
+                        # Target language clarifier in this case is class dsense.
+                        # If this exists, then this must be removed from the overarching element.
+                        # Set it to to2 so it can be paired with the ToWrd which follows it.
+                        for to2 in dsenses:
+                            fr2 = fr2.replace(to2, "")
+                            to2 = " " + to2
+                        entry.l1_add = fr2
+                        after_frwrd = False
+
+                    # On WordReference, To2 is class used for target language clarifiers that
+                    # do not have corresponding clarifier for source language.
+                    # Set it to to2 so it can be paired with the ToWrd which follows it.
+                    elif cl == ['To2']:
+                        to2 = text
+                        after_frwrd = False
+
+                    # On WordReference, ToWrd is class for target language word.
+                    # If to2 is set to anything,
+                    # then this means there is additional info to pair with target word.
+                    # See two preceding if statements on same indentation level.
+                    # (i.e. (cl is None and after_frwrd) and (cl == ['To2']))
+                    elif cl == ['ToWrd']:
+                        entry.l2.append(Translation(text, to2))
+                        to2 = ''
+                        after_frwrd = False
+
+                    # On WordReference, FrEx is class for example sentences in source language.
+                    elif cl == ['FrEx']:
+                        entry.l1_ex.append(text)
+                        after_frwrd = False
+
+                    # On WordReference, ToEx is class for example sentences in target language.
+                    elif cl == ['ToEx']:
+                        entry.l2_ex.append(text)
+                        after_frwrd = False
+
+    # As unlikely as it is, if user types gibberish words made of punctuation marks,
+    # WordReference leads to home page rather than "no translation found" page.
+    # This if-else statement catches this.
+    # Return results or error result accordingly.
+    if entry.l1 is not None:
+        defs.append(entry)
+        return Result(term, "WordReference", r.url, defs, pair, print_entry)
+    elif wrong_order:
+        return error_result(term, "WordReference", r.url, order_error)
+    else:
+        return error_result(term, "WordReference", r.url, print_error)
+
+
+def url_ending(language_pair):
+    """This function determines the ending of the URL address for language_pair.
+
+    Returns a tuple: the URL ending and the LanguagePair (see language_terms.py) of the pair.
     """
-    # Determine ending of URL address.
+    pair_info = language_terms.pair_for(language_pair)
+
     # Spanish uses a different format.
     # All other languages use a pair of two-letter abbreviations. See l_terms in language_terms.py for more info.
-    foreign_language = "Spanish"
     if language_pair == ['English', 'Spanish']:
         l_term = "es/translation.asp?tranword="
     elif language_pair == ['Spanish', 'English']:
         l_term = "es/en/translation.asp?spen="
     else:
-        l_term = ''
-        for language in language_pair:
-            l_term += language_terms.l_terms[language]
-            if language != "English":
-                foreign_language = language
-        l_term += '/'
-
-    # Define empty list for search results and start ticker variable.
-    # If user clicks the cancel button, cancel_process will be set to True.
-    return_terms = []
-    num = 1
-    cancel_process = False
-
-    for term in terms:
-        if cancel_process:
-            break
-
-        url = "https://www.wordreference.com/" + l_term + term
-        r = requests.get(url, timeout=10)
-        soup = BeautifulSoup(r.text, "lxml")
-
-        # Determine whether page has valid search results.
-        if len(soup.find_all(id='noTransFound')) > 0:
-            return_terms.append(print_error(term, r.url))
-        else:
-            # Extract search results from page.
-            entries = soup.findAll('tr', class_=['odd', 'even'])
-
-            # Declare empty string for definitions.
-            defs = ''
-
-            # Declare empty dictionary for entry.
-            entry = new_entry()
-
-            # after_frwrd is used because on WordReference, additional info added to clarify the meaning
-            # of the source word is added in an unclassed element immediately after the word.
-            # after_frwrd is set to True after FrWrd, to False after anything else.
-            after_frwrd = False
-
-            # first_entry is used to prevent an empty entry at first FrWrd.
-            first_entry = True
-
-            # A string to hold the language pair for this specific search result's website.
-            # This will be changed as the function checks the language pair in the header.
-            pair = ''
-
-            # If the header finds the langauges in the wrong order (i.e. opposite of language_pair passed to this
-            # function, then this will be set to True.
-            wrong_order = False
-
-            # Determine the language pair order by iterating through elements of the header on the website.
-            header = soup.find('tr', class_='langHeader')
-            if header is not None:
-                for c in header:
-                    if foreign_language == "Spanish":
-                        if c.text in language_terms.spanish_terms["English"]:
-                            pair += language_terms.l_terms["English"]
-                        elif c.text in language_terms.spanish_terms["Spanish"]:
-                            pair += language_terms.l_terms["Spanish"]
-                    else:
-                        if c.text == language_terms.autoglottonyms[foreign_language]:
-                            pair += language_terms.l_terms[foreign_language]
-                        elif c.text == language_terms.english_names[foreign_language]:
-                            pair += language_terms.l_terms["English"]
-                    if len(pair) == 4:
-                        continue
-                # If search results have language pair in wrong order and strict_search is set to True.
-                if pair != l_term[:-1] and strict_search:
-                    wrong_order = True
-                else:
-                    # Iterate through search results for each term.
-                    for i in entries:
-                        to2 = ''
-                        for n in i.children:
-                            if n.name is not None:
-                                # Find out what we're looking at.
-                                cl = n.attrs.get('class')
-
-                                # FrWrd is class used for words in left column (the source language).
-                                # If first entry, set first_entry to false.
-                                # Otherwise, add previous entry to definitions and start new entry.
-                                # after_frwrd is set to True as this element may be followed by additional info.
-                                if cl == ['FrWrd']:
-                                    if first_entry:
-                                        first_entry = False
-                                    else:
-                                        defs += print_entry(entry, pair)
-                                        entry = new_entry()
-
-                                    entry['l1'] = n.text
-                                    after_frwrd = True
-
-                                # If both class is None and after_frwrd is True, this means it's
-                                # clarifying information after source language word.
-                                elif cl is None and after_frwrd:
-                                    fr2 = n.text
-
-                                    # On WordReference, if both source language and target language have
-                                    # clarifying info, these are bundled into one element.
-                                    # This element must therefore be iterated through to be split up.
-                                    for c in n.children:
-                                        if c.name is not None:
-
-                                            # Target language clarifier in this case is class dsense.
-                                            # If this exists, then this must be removed from the overarching element.
-                                            # Set it to to2 so it can be paired with the ToWrd which follows it.
-                                            cl2 = c.attrs.get('class')
-                                            if cl2 == ['dsense']:
-                                                to2 = c.text
-                                                fr2 = fr2.replace(to2, "")
-                                                to2 = " " + to2
-                                    entry['l1_add'] = fr2
-                                    after_frwrd = False
-
-                                # On WordReference, To2 is class used for target language clarifiers that
-                                # do not have corresponding clarifier for source language.
-                                # Set it to to2 so it can be paired with the ToWrd which follows it.
-                                elif cl == ['To2']:
-                                    to2 = n.text
-                                    after_frwrd = False
-
-                                # On WordReference, ToWrd is class for target language word.
-                                # If to2 is set to anything,
-                                # then this means there is additional info to pair with target word.
-                                # See two preceding if statements on same indentation level.
-                                # (i.e. (cl is None and after_frwrd) and (cl == ['To2']))
-                                elif cl == ['ToWrd']:
-                                    entry['l2'].append({'word': n.text, 'add': to2})
-                                    to2 = ''
-                                    after_frwrd = False
-
-                                # On WordReference, FrEx is class for example sentences in source language.
-                                elif cl == ['FrEx']:
-                                    entry['l1_ex'].append(n.text)
-                                    after_frwrd = False
-
-                                # On WordReference, ToEx is class for example sentences in target language.
-                                elif cl == ['ToEx']:
-                                    entry['l2_ex'].append(n.text)
-                                    after_frwrd = False
-
-            # As unlikely as it is, if user types gibberish words made of punctuation marks,
-            # WordReference leads to home page rather than "no translation found" page.
-            # This if-else statement catches this.
-            # Add compiled results or error message accordingly.
-            if 'l1' in entry:
-                defs += print_entry(entry, pair)
-                defs += "\nSource:\n" + r.url
-            elif wrong_order:
-                defs += order_error(term, r.url)
-            else:
-                defs += print_error(term, r.url)
-            return_terms.append(defs)
-
-        # Have ticker window update progress.
-        cancel_process = ticker.update_ticker(num, len(terms))
-        num += 1
-    return return_terms
+        l_term = pair_info.codes + '/'
+    return l_term, pair_info
+
+
+def iter_search(terms, language_pair, strict_search, cancel=None, on_result=None):
+    """This function looks up terms on WordReference and yields (index, term, Result) as each lookup finishes.
+
+    terms, language_pair and strict_search are as for search(). cancel and on_result are as for
+    fetcher.iter_fetch().
+    """
+    # Work out the language pair once for the whole batch, rather than for every page.
+    l_term, pair_info = url_ending(language_pair)
+    return fetcher.iter_fetch(terms,
+                              partial(fetch, l_term=l_term),
+                              partial(parse, pair_info=pair_info, strict_search=strict_search),
+                              fetcher.host_of(base_url),
+                              ("WordReference", l_term),
+                              cancel,
+                              on_result)
+
+
+def search(terms, language_pair, strict_search, ticker):
+    """This function looks up terms on WordReference, extracts search results and compiles list of results.
+
+    terms = Terms to be looked up.
+    language_pair = List of to and from languages to be looked up.
+    strict_search = If reverse-order results should be disallowed if correct-order results don't exist.
+    ticker = The window that has a ticker page to update user on progress.
+
+    Returns a list of Results.
+    """
+    return fetcher.collect(iter_search(terms, language_pair, strict_search), len(terms), ticker)
@@ -0,0 +1,154 @@
+from bisect import bisect_left
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt5.QtGui import QBrush, QColor
+
+
+class ResultsModel(QAbstractListModel):
+    """The list of searched terms shown on the results page, over the window's terms and results lists.
+
+    Rows are only worked out when the view asks for them, i.e. for the rows that are on screen, so the list
+    stays quick with tens of thousands of results. Each row shows a term, greyed out if it had no results
+    and marked if it is still being looked up. The rendered results are only shown for the selected term.
+
+    The list can be narrowed with set_filter() (terms containing some text) and set_matches() (e.g. the results
+    that match a search_index query). Rows then map to indices into terms and results through rows.
+    """
+    # The colours of terms that had no results and terms that are still being looked up.
+    not_found_brush = QBrush(QColor(140, 140, 140))
+    searching_brush = QBrush(QColor(90, 120, 200))
+
+    def __init__(self, terms, results, parent=None):
+        super().__init__(parent)
+        self.terms = terms
+        self.results = results
+
+        # rows is the sorted list of indices that are shown, or None when every term is shown.
+        # filter_text and matches are what set_filter() and set_matches() were last called with.
+        self.rows = None
+        self.filter_text = ''
+        self.matches = None
+
+        # folded holds the lower-case terms for filtering, made the first time the list is filtered.
+        # first_index maps each term to where it first appears in terms, made the first time a term is jumped to.
+        self.folded = None
+        self.first_index = None
+
+    def reset(self, terms, results):
+        """This function shows a new search's terms and results, removing any filter."""
+        self.beginResetModel()
+        self.terms = terms
+        self.results = results
+        self.rows = None
+        self.filter_text = ''
+        self.matches = None
+        self.folded = None
+        self.first_index = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.rows is None:
+            return len(self.terms)
+        return len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        i = self.index_of(index.row())
+        if role == Qt.DisplayRole:
+            if self.results[i] is None:
+                return self.terms[i] + " ..."
+            return self.terms[i]
+        if role == Qt.ForegroundRole:
+            if self.results[i] is None:
+                return self.searching_brush
+            if not self.results[i].found():
+                return self.not_found_brush
+        return None
+
+    def index_of(self, row):
+        """This function returns the index into terms and results of row."""
+        if self.rows is None:
+            return row
+        return self.rows[row]
+
+    def row_of(self, i):
+        """This function returns the row that shows the term at index i, or None if it is filtered out."""
+        if self.rows is None:
+            return i
+        row = bisect_left(self.rows, i)
+        if row < len(self.rows) and self.rows[row] == i:
+            return row
+        return None
+
+    def result_changed(self, i):
+        """This function updates the row of the term at index i once its result has arrived."""
+        row = self.row_of(i)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    def set_filter(self, text):
+        """This function only shows the terms that contain text, ignoring capitalization. '' shows every term."""
+        self.filter_text = text.strip().casefold()
+        self.update_rows()
+
+    def set_matches(self, indices):
+        """This function only shows the terms at indices (any iterable of indices), or every term if None."""
+        self.matches = None if indices is None else sorted(indices)
+        self.update_rows()
+
+    def update_rows(self):
+        """This function works out which terms are shown, i.e. those left by both the filter and the matches."""
+        rows = self.matches
+        if self.filter_text != '':
+            if self.folded is None:
+                self.folded = [t.casefold() for t in self.terms]
+            text = self.filter_text
+            if rows is None:
+                rows = [i for i, t in enumerate(self.folded) if text in t]
+            else:
+                rows = [i for i in rows if text in self.folded[i]]
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def step(self, i, inc):
+        """This function returns the index of the term inc rows away from the term at index i, looping around.
+
+        inc is negative to step backwards. If the term at i is filtered out, steps from where it would be.
+        Returns None if no terms are shown.
+        """
+        n = self.rowCount()
+        if n == 0:
+            return None
+        if self.rows is None:
+            return (i + inc) % n
+        row = bisect_left(self.rows, i)
+        if row < n and self.rows[row] == i or inc < 0:
+            row += inc
+        else:
+            row += inc - 1
+        return self.rows[row % n]
+
+    def find(self, term):
+        """This function returns the index of term in terms, or of the first term starting with it. None if neither.
+
+        Capitalization is ignored.
+        """
+        term = term.strip().casefold()
+        if term == '':
+            return None
+        if self.first_index is None:
+            self.first_index = {}
+            for i, t in enumerate(self.terms):
+                self.first_index.setdefault(t.casefold(), i)
+        if term in self.first_index:
+            return self.first_index[term]
+        if self.folded is None:
+            self.folded = [t.casefold() for t in self.terms]
+        for i, t in enumerate(self.folded):
+            if t.startswith(term):
+                return i
+        return None
@@ -1,10 +1,16 @@
 import sys
-from languages import hebrew_morfix, arabic_arabdict, chinese_mdbg, wordreference
-from PyQt5.QtCore import Qt
+from languages import dictionaries, memory, prefetch, search_index, trace
+from view.results_model import ResultsModel
+from view.worker import SearchWorker
+from PyQt5.QtCore import Qt, QThread, QTimer
 from PyQt5.QtGui import QIcon, QFont
 from PyQt5.QtWidgets import QWidget, QApplication, QVBoxLayout, QComboBox, QLabel
 from PyQt5.QtWidgets import QLineEdit, QPushButton, QHBoxLayout, QCheckBox, QFrame
-from PyQt5.QtWidgets import QPlainTextEdit, QStackedLayout, QProgressBar
+from PyQt5.QtWidgets import QPlainTextEdit, QStackedLayout, QProgressBar, QMessageBox, QSpinBox, QListView
+
+
+# prefetch_delay is how many milliseconds after the user stops typing prefetching starts.
+prefetch_delay = 700
 
 
 class VocabWindow(QWidget):
@@ -16,21 +22,6 @@ class VocabWindow(QWidget):
 
         # Declare instance variables that need to accessed by various functions.
 
-        # langs_latin is a set of all the languages that use the Latin script.
-        self.langs_latin = {'French',
-                            'Spanish',
-                            'Portuguese',
-                            'Italian',
-                            'Romanian',
-                            'German',
-                            'Dutch',
-                            'Polish',
-                            'Czech',
-                            'Swedish',
-                            'Icelandic',
-                            'Turkish'
-                            }
-
         # en_to_l2(i.e. English to L2) indicates whether English is the source or target language.
         self.en_to_l2 = True
 
@@ -40,50 +31,62 @@ class VocabWindow(QWidget):
         font.setPointSize(16)
         self.input_box.setFont(font)
 
+        # search_thread and search_worker run the search in the background while one is in progress.
+        # They are None otherwise.
+        self.search_thread = None
+        self.search_worker = None
+
+        # results_memory keeps the results of this session's lookups, including prefetched ones (see
+        # languages/memory.py). prefetcher looks up completed lines in the background while the user types,
+        # if the option is checked. prefetch_timer waits for a pause in typing before starting it.
+        self.results_memory = memory.ResultMemory()
+        self.prefetcher = prefetch.Prefetcher(self.results_memory)
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(prefetch_delay)
+        self.prefetch_timer.timeout.connect(self.prefetch)
+
+        # selected_options is set by create_input_page() to a function that returns the options selected,
+        # as a tuple of foreign language, dictionary, strict search, casefold, whether the input is running text,
+        # how many of its words to look up (None for all) and whether to prefetch.
+        self.selected_options = None
+
+        # trace_recorder collects the timings of the current search's lookups, if trace.export_path or
+        # trace.ticker_summary is set (see languages/trace.py). It is None otherwise.
+        self.trace_recorder = None
+
         # cancel_process is used to determine whether user clicked the cancel button on ticker_page.
         self.cancel_process = False
 
-        # results is what the search functions return.
+        # results is what the search functions return (a list of Result objects, see languages/results.py).
         # terms is what was looked up.
         self.results = []
         self.terms = []
 
-        # results_label and results_view is where results are displayed.
-        # results_index is which result is being shown. results_index_label is where the index is shown.
-        self.results_label = QLineEdit()
-        self.results_label.setReadOnly(True)
-        self.results_label.setFont(font)
+        # result_index indexes the words in the current search's results as they arrive, for search_box on the
+        # results page (see languages/search_index.py).
+        self.result_index = search_index.ResultIndex()
 
-        self.results_view = QPlainTextEdit()
-        self.results_view.setReadOnly(True)
-        self.results_view.setFont(font)
+        # reused is how many of the terms being searched had been looked up before with the same options.
+        self.reused = 0
 
+        # results_index is which result is being shown.
         self.results_index = 0
 
-        self.results_index_label = QLabel()
-        self.results_index_label.setAlignment(Qt.AlignCenter)
-
-        # ticker is the label and ticker_bar is the progress bar which indicate progress of searching.
-        self.ticker = QLabel()
-        self.ticker.setFont(QFont('Times font', 16))
-        self.ticker.setAlignment(Qt.AlignCenter)
-
-        self.ticker_bar = QProgressBar()
-        self.ticker_bar.setAlignment(Qt.AlignCenter)
-
         # Setting up individual pages for StackedLayout pages.
+        # To make the window show sooner, only the info page is built before it is shown. The options page is
+        # built as soon as the window is up, and the ticker and results pages when they are first needed
+        # (see get_ticker_page() and get_results_page()). They are None until then.
         self.info_page = QWidget()
         self.options_page = QWidget()
-        self.ticker_page = QWidget()
-        self.results_page = QWidget()
+        self.ticker_page = None
+        self.results_page = None
         self.pages = QStackedLayout()
 
         self.setLayout(self.pages)
 
         self.create_info_page()
-        self.create_input_page()
-        self.create_ticker_page()
-        self.create_results_page()
+        QTimer.singleShot(0, self.create_input_page)
 
         # Enter the mainloop.
         self.show()
@@ -116,25 +119,7 @@ class VocabWindow(QWidget):
         # The first row is for language selection.
         language_select_label = QLabel("Select language:")
         language_select = QComboBox()
-        langs = ['French',
-                 'Spanish',
-                 'Italian',
-                 'Portuguese',
-                 'Romanian',
-                 'German',
-                 'Dutch',
-                 'Polish',
-                 'Czech',
-                 'Swedish',
-                 'Icelandic',
-                 'Turkish',
-                 'Greek',
-                 'Chinese',
-                 'Korean',
-                 'Arabic',
-                 'Hebrew'
-                 ]
-        language_select.addItems(langs)
+        language_select.addItems(dictionaries.langs)
 
         language_row = QHBoxLayout()
         language_row.addWidget(language_select_label)
@@ -143,25 +128,7 @@ class VocabWindow(QWidget):
         # The second row is for dictionary selection.
         search_select_label = QLabel("Search on:")
         search_select = QComboBox()
-        lang_search_options = {'French': ["WordReference"],
-                               'Spanish': ["WordReference"],
-                               'Italian': ["WordReference"],
-                               'Portuguese': ["WordReference"],
-                               'Romanian': ["WordReference"],
-                               'German': ["WordReference"],
-                               'Dutch': ["WordReference"],
-                               'Polish': ["WordReference"],
-                               'Czech': ["WordReference"],
-                               'Swedish': ["WordReference"],
-                               'Icelandic': ["WordReference"],
-                               'Turkish': ["WordReference"],
-                               'Greek': ["WordReference"],
-                               'Chinese': ["MDBG"],
-                               'Korean': ["WordReference"],
-                               'Arabic': ["ArabDict", "WordReference"],
-                               'Hebrew': ["Morfix"]
-                               }
-        search_select.addItems(lang_search_options['French'])
+        search_select.addItems(dictionaries.search_options('French'))
 
         search_row = QHBoxLayout()
         search_row.addWidget(search_select_label)
@@ -185,15 +152,39 @@ class VocabWindow(QWidget):
         # French-to-English results but no English-to-French, should this be included?
         reverse_checkbox = QCheckBox("Allow search results with reversed language pair")
 
+        # The fifth row is for an option to treat terms that only differ in capitalization as the same term,
+        # so that e.g. "Maison" at the start of a sentence and "maison" are only looked up once.
+        casefold_checkbox = QCheckBox("Ignore capitalization")
+
         # Encase the last two rows in a frame which can be hidden based on whether
         # the language selected uses the Latin alphabet. See switch_direction() above for reasoning for this.
         latin_layout = QVBoxLayout()
         latin_layout.addLayout(direction_row)
         latin_layout.addWidget(reverse_checkbox)
+        latin_layout.addWidget(casefold_checkbox)
 
         latin_visible = QFrame()
         latin_visible.setLayout(latin_layout)
 
+        # Below the input box is an option to start looking terms up while they are still being typed,
+        # so that most of them are already done when the search button is clicked.
+        prefetch_checkbox = QCheckBox("Look terms up while typing")
+
+        # There is also an option to paste running text (e.g. a paragraph or a chapter) instead of one term per
+        # line. Its words are picked out and each one is looked up once, most frequent first. limit_box caps how
+        # many of them are looked up (0 for all).
+        paragraph_checkbox = QCheckBox("Pick out the words of pasted text")
+        limit_label = QLabel("Most frequent words to look up (0 for all):")
+        limit_box = QSpinBox()
+        limit_box.setRange(0, 100000)
+        limit_box.setEnabled(False)
+        paragraph_checkbox.toggled.connect(limit_box.setEnabled)
+
+        paragraph_row = QHBoxLayout()
+        paragraph_row.addWidget(paragraph_checkbox)
+        paragraph_row.addWidget(limit_label)
+        paragraph_row.addWidget(limit_box)
+
         # Button to start search.
         search_button = QPushButton("Search")
 
@@ -203,6 +194,8 @@ class VocabWindow(QWidget):
         options.addLayout(search_row)
         options.addWidget(latin_visible)
         options.addWidget(self.input_box)
+        options.addLayout(paragraph_row)
+        options.addWidget(prefetch_checkbox)
         options.addWidget(search_button)
 
         self.options_page.setLayout(options)
@@ -211,7 +204,8 @@ class VocabWindow(QWidget):
 
         # If language_select is changed, search_select must be updated.
         language_select.currentIndexChanged.connect(lambda:
-                                                    self.update_search_options(search_select, lang_search_options,
+                                                    self.update_search_options(search_select,
+                                                                               dictionaries.search_options,
                                                                                language_select.currentText(),
                                                                                latin_visible, direction)
                                                     )
@@ -219,29 +213,45 @@ class VocabWindow(QWidget):
         # If direction_switch is clicked, change direction of search.
         direction_switch.clicked.connect(lambda: self.switch_direction(direction, language_select.currentText()))
 
+        # Prefetching uses whatever options are selected when it starts, and starts over when they change.
+        self.selected_options = lambda: (language_select.currentText(),
+                                         search_select.currentText(),
+                                         not reverse_checkbox.isChecked(),
+                                         casefold_checkbox.isChecked(),
+                                         paragraph_checkbox.isChecked(),
+                                         limit_box.value() or None,
+                                         prefetch_checkbox.isChecked())
+        self.input_box.textChanged.connect(self.prefetch_timer.start)
+        language_select.currentIndexChanged.connect(self.options_changed)
+        search_select.currentIndexChanged.connect(self.options_changed)
+        direction_switch.clicked.connect(self.options_changed)
+        reverse_checkbox.stateChanged.connect(self.options_changed)
+        casefold_checkbox.stateChanged.connect(self.options_changed)
+        prefetch_checkbox.stateChanged.connect(self.options_changed)
+        paragraph_checkbox.stateChanged.connect(self.options_changed)
+        limit_box.valueChanged.connect(self.options_changed)
+
         # Make search_button start search.
         search_button.clicked.connect(lambda: self.run_searches(self.input_box.toPlainText(),
-                                                                language_select.currentText(),
-                                                                search_select.currentText(),
-                                                                not reverse_checkbox.isChecked())
+                                                                *self.selected_options()[:-1])
                                       )
 
     def update_search_options(self, search, options, lang, latin_visible, direction):
         """This function updates the dictionary seasrch options when a different language is selected.
 
         search = QComboBox that lists dictionary options.
-        options = Dictionary that contains dictionary options.
+        options = Function that returns the dictionary options of a language.
         lang = Language that search must be set to.
         latin_visible = Frame that should be visible with languages with Latin alphabet.
         direction = QLineEdit that states language order, must be updated with new langauge.
         """
         # Repopulate search QComboBox with appropriate search options.
         search.clear()
-        search.addItems(options[lang])
+        search.addItems(options(lang))
 
         # If language uses Latin alphabet, latin_visible should be visible, hidden otherwise.
         # Also update direction with new language if it needs to be visible.
-        if lang in self.langs_latin:
+        if lang in dictionaries.langs_latin:
             latin_visible.setHidden(False)
             if self.en_to_l2:
                 direction.setText("English to " + lang)
@@ -274,70 +284,175 @@ class VocabWindow(QWidget):
         else:
             direction_bar.setText(lang + " to English")
 
-    def run_searches(self, user_input, foreign_lang, dictionary, strict_search):
+    def options_changed(self):
+        """This function cancels any prefetching, as it used the old options, and starts it over after a pause."""
+        self.prefetcher.cancel()
+        self.prefetch_timer.start()
+
+    def prefetch(self):
+        """This function starts looking up the completed lines of the input box in the background, if enabled.
+
+        A line counts as completed once a new line has been started after it.
+        The results are remembered in results_memory, where run_searches() finds them.
+        """
+        if self.selected_options is None or self.search_thread is not None:
+            return
+        foreign_lang, dictionary, strict_search, casefold, running_text, limit, enabled = self.selected_options()
+        if not enabled:
+            return
+
+        lines = self.input_box.toPlainText().split('\n')[:-1]
+        if running_text:
+            terms = dictionaries.text_terms('\n'.join(lines), foreign_lang, casefold, limit)
+        else:
+            terms = dictionaries.clean_terms(lines, foreign_lang, casefold)
+        self.prefetcher.prefetch(terms, foreign_lang, dictionary, self.en_to_l2, strict_search)
+
+    def run_searches(self, user_input, foreign_lang, dictionary, strict_search, casefold=False, running_text=False,
+                     limit=None):
         """This function starts the search process, preparing the parameters.
 
         user_input = What has been typed into the input box.
         foreign_lang = The foreign language selected.
         dictionary = The dictionary selected.
         strict_search = Whether reverse-language results should be excluded.
+        casefold = Whether terms that only differ in capitalization should be treated as the same term.
+        running_text = Whether user_input is running text whose words should be picked out, rather than one term
+                       per line.
+        limit = With running_text, how many of the most frequent words to look up, or None for all of them.
         """
-        # If input has nothing in it, ignore. Split into list otherwise.
-        if len(user_input) > 0 and not self.cancel_process:
-            self.terms = user_input.split('\n')
-
-            # Define dictionary search function to be called.
-            dictionaries = {"WordReference": [wordreference.search, 3],
-                            "MDBG": [chinese_mdbg.mdbg, 1],
-                            "ArabDict": [arabic_arabdict.arabdict, 1],
-                            "Morfix": [hebrew_morfix.morfix, 1]
-                            }
-            f = dictionaries[dictionary][0]
-
-            # Define language_pair.
-            language_pair = []
-            if self.en_to_l2:
-                language_pair.append("English")
-                language_pair.append(foreign_lang)
-            else:
-                language_pair.append(foreign_lang)
-                language_pair.append("English")
-
-            # If foreign language does not use Latin alphabet, then strict_search does not matter.
-            if foreign_lang not in self.langs_latin:
-                strict_search = False
+        # If a search is already running, ignore.
+        if self.search_thread is not None:
+            return
+
+        # Split input into list of terms, cleaning up whitespace and dropping blank lines,
+        # or pick out the words of running text. If input has nothing in it, ignore.
+        if running_text:
+            terms = dictionaries.text_terms(user_input, foreign_lang, casefold, limit)
+        else:
+            terms = dictionaries.clean_terms(user_input.split('\n'), foreign_lang, casefold)
+        if len(terms) > 0:
+            self.terms = terms
+
+            # The search takes over from prefetching. Terms that were prefetched or looked up by an earlier search
+            # with the same options are taken from results_memory; only new or changed terms are looked up.
+            self.prefetch_timer.stop()
+            self.prefetcher.cancel()
+            options = dictionaries.memory_options(foreign_lang, dictionary, self.en_to_l2, strict_search)
+            self.reused = self.results_memory.count(options, self.terms)
+
+            # Results are filled in as they arrive. None means the term is still being looked up.
+            self.results = [None] * len(self.terms)
+            self.results_index = 0
+            self.result_index = search_index.ResultIndex()
+            self.reset_results_list()
+            ticker_page = self.get_ticker_page()
+            self.view_results_button.setEnabled(False)
+
+            # Run the search on a worker thread so the window keeps responding while terms are looked up.
+            # The worker reports back through signals, which are delivered on the GUI thread.
+            self.cancel_process = False
+            if trace.export_path is not None or trace.ticker_summary:
+                self.trace_recorder = trace.Recorder()
+                trace.add_hook(self.trace_recorder)
+            args = (self.terms, foreign_lang, dictionary, self.en_to_l2, strict_search, self.results_memory)
+            self.search_worker = SearchWorker(dictionaries.iter_search, args)
+            self.search_thread = QThread()
+            self.search_worker.moveToThread(self.search_thread)
+
+            self.search_thread.started.connect(self.search_worker.run)
+            self.search_worker.progress.connect(self.update_ticker)
+            self.search_worker.result.connect(self.add_result)
+            self.search_worker.error.connect(self.search_failed)
+            self.search_worker.finished.connect(self.search_finished)
 
             # Change page to ticker page and then run search.
-            self.pages.setCurrentWidget(self.ticker_page)
-            self.app.processEvents()
+            self.pages.setCurrentWidget(ticker_page)
+            self.search_thread.start()
 
-            # Call function with correct number of parameters.
-            # WordReference requires language_pair and strict_search; other functions don't.
-            if dictionaries[dictionary][1] == 3:
-                self.results = f(self.terms, language_pair, strict_search, self)
-            else:
-                self.results = f(self.terms, self)
-
-            # Reset ticker label and progress bar for next search if there is one.
-            self.ticker.setText('')
-            self.ticker_bar.setValue(0)
-
-            # If the process was canceled, it should go back to the options page without displaying results.
-            # Make cancel_process False so that search can be started if the user tries to start it.
-            # Empty out terms and results as these are only needed for searching and results.
-            if self.cancel_process:
-                self.cancel_process = False
-                self.results = []
-                self.terms = []
-                self.pages.setCurrentWidget(self.options_page)
-            # If the process finished without being canceled, it should go to the results page.
-            # show_results is called with inc of 0 to show first result.
-            else:
-                self.show_results(0)
-                self.pages.setCurrentWidget(self.results_page)
+    def add_result(self, i, term, result):
+        """This function is connected to the search worker's result signal and stores a finished result.
+
+        The user can look at the results page as soon as the first result is in.
+        """
+        self.results[i] = result
+        self.result_index.add(i, result)
+        self.view_results_button.setEnabled(True)
+        if self.results_page is not None:
+            self.results_model.result_changed(i)
+
+        # If the user is already looking at this term, replace the "still searching" message with the result.
+        if self.results_page is not None and self.pages.currentWidget() is self.results_page \
+                and i == self.results_index:
+            self.show_results(0)
+
+    def search_finished(self):
+        """This function is called when the worker thread's search ends, whether it finished or was canceled."""
+        # Stop the worker thread and let Qt delete it and the worker once it has stopped.
+        self.search_thread.quit()
+        self.search_thread.wait()
+        self.search_worker.deleteLater()
+        self.search_thread.deleteLater()
+        self.search_worker = None
+        self.search_thread = None
+
+        # Stop timing lookups and save the timings if asked to.
+        if self.trace_recorder is not None:
+            trace.remove_hook(self.trace_recorder)
+            if trace.export_path is not None:
+                self.trace_recorder.save(trace.export_path)
+            self.trace_recorder = None
+
+        # Reset ticker label and progress bar for next search if there is one.
+        self.ticker.setText('')
+        self.ticker_bar.setValue(0)
+
+        # If the process was canceled or failed, it should go back to the options page without displaying results.
+        # Make cancel_process False so that search can be started if the user tries to start it.
+        # Empty out terms and results as these are only needed for searching and results.
+        if self.cancel_process or self.results.count(None) == len(self.results):
+            self.cancel_process = False
+            self.results = []
+            self.terms = []
+            self.reset_results_list()
+            self.pages.setCurrentWidget(self.options_page)
+        # If the process finished without being canceled, it should go to the results page.
+        # show_results is called with inc of 0 to show the first result,
+        # or to refresh the result being shown if the user is already on the results page.
+        else:
+            results_page = self.get_results_page()
+
+            # A search of the results typed in while terms were still being looked up is run again over all of them.
+            if self.search_box.text().strip() != '':
+                self.search_results(self.search_box.text())
+            self.show_results(0)
+            self.pages.setCurrentWidget(results_page)
+
+    def search_failed(self, message):
+        """This function tells the user that the search stopped because of an error (e.g. the website was down)."""
+        self.cancel_process = True
+        QMessageBox.warning(self, "Vocab Searcher", "The search could not be completed:\n" + message)
+
+    def get_ticker_page(self):
+        """This function returns the ticker page, creating it the first time it is needed."""
+        if self.ticker_page is None:
+            self.create_ticker_page()
+        return self.ticker_page
 
     def create_ticker_page(self):
         """This function creates the ticker page which reports progress to the user and has a cancel button."""
+        # ticker is the label and ticker_bar is the progress bar which indicate progress of searching.
+        self.ticker = QLabel()
+        self.ticker.setFont(QFont('Times font', 16))
+        self.ticker.setAlignment(Qt.AlignCenter)
+
+        self.ticker_bar = QProgressBar()
+        self.ticker_bar.setAlignment(Qt.AlignCenter)
+
+        # view_results_button opens the results page while the search is still running.
+        self.view_results_button = QPushButton("View Results So Far")
+        self.view_results_button.setEnabled(False)
+
         ticker_frame = QFrame()
         ticker_frame_layout = QVBoxLayout()
         ticker_frame_layout.addWidget(self.ticker)
@@ -347,30 +462,87 @@ class VocabWindow(QWidget):
         cancel_button = QPushButton("Cancel")
         cancel_button.clicked.connect(self.cancel)
 
+        # view_results_button lets the user start reading results while the rest are still being looked up.
+        self.view_results_button.clicked.connect(self.view_results)
+
         ticker_display = QVBoxLayout()
         ticker_display.addWidget(ticker_frame)
+        ticker_display.addWidget(self.view_results_button)
         ticker_display.addWidget(cancel_button)
 
+        self.ticker_page = QWidget()
         self.ticker_page.setLayout(ticker_display)
 
         self.pages.addWidget(self.ticker_page)
 
+    def view_results(self):
+        """This function switches to the results page before the search has finished."""
+        results_page = self.get_results_page()
+        self.show_results(0)
+        self.pages.setCurrentWidget(results_page)
+
     def cancel(self):
-        """If the cancel button is clicked on the ticker page, then set cancel_process to True."""
+        """If the cancel button is clicked on the ticker page, then set cancel_process to True and stop the worker."""
         self.cancel_process = True
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+            self.ticker.setText("Canceling...")
 
     def update_ticker(self, x, y):
-        """This function is called by the search functions in the language folder to update ticker.
-
-        Returns cancel_process so that if user clicks the cancel button, the search process will end.
-        """
-        self.ticker.setText("Searching in progress.\nPlease wait.\n" + str(x) + " out of " + str(y))
+        """This function is connected to the search worker's progress signal to update ticker."""
+        if self.cancel_process:
+            return
+        text = "Searching in progress.\nPlease wait.\n" + str(x) + " out of " + str(y)
+        if self.reused > 0:
+            text += "\n(" + str(self.reused) + " already looked up earlier)"
+        if trace.ticker_summary and self.trace_recorder is not None:
+            text += "\n\n" + self.trace_recorder.summary()
+        self.ticker.setText(text)
         self.ticker_bar.setValue(round(x/y*100))
-        self.app.processEvents()
-        return self.cancel_process
+
+    def get_results_page(self):
+        """This function returns the results page, creating it the first time it is needed."""
+        if self.results_page is None:
+            self.create_results_page()
+        return self.results_page
 
     def create_results_page(self):
         """This function creates the results page where search results are displayed to the user."""
+        # results_label and results_view is where results are displayed.
+        # results_index_label is where the index of the result being shown is shown.
+        font = QFont()
+        font.setPointSize(16)
+
+        self.results_label = QLineEdit()
+        self.results_label.setReadOnly(True)
+        self.results_label.setFont(font)
+
+        self.results_view = QPlainTextEdit()
+        self.results_view.setReadOnly(True)
+        self.results_view.setFont(font)
+
+        self.results_index_label = QLabel()
+        self.results_index_label.setAlignment(Qt.AlignCenter)
+
+        # results_list lists every term searched, next to the result of the one selected. Its model only works
+        # out the rows on screen, so it stays quick with very large batches (see view/results_model.py).
+        # filter_box narrows the list down as the user types, and jump_box selects the term typed into it.
+        self.results_model = ResultsModel(self.terms, self.results, self)
+        self.results_list = QListView()
+        self.results_list.setUniformItemSizes(True)
+        self.results_list.setModel(self.results_model)
+        self.filter_box = QLineEdit()
+        self.filter_box.setPlaceholderText("Filter terms")
+        self.filter_box.setClearButtonEnabled(True)
+        self.jump_box = QLineEdit()
+        self.jump_box.setPlaceholderText("Go to term")
+
+        # search_box narrows the list down to the terms whose results contain the words typed into it,
+        # e.g. "house" or "translation:house" (see languages/search_index.py for what can be typed).
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search results, e.g. translation:house or has:example")
+        self.search_box.setClearButtonEnabled(True)
+
         # First row is for "previous" and "next" buttons,
         # as well as an indicator of which result is displayed and how many results there are.
         prev_btn = QPushButton("Previous")
@@ -387,39 +559,137 @@ class VocabWindow(QWidget):
         end_row.addWidget(again)
         end_row.addWidget(close)
 
+        # The list of terms is on the left, the result of the selected term on the right.
+        list_column = QVBoxLayout()
+        list_column.addWidget(self.search_box)
+        list_column.addWidget(self.filter_box)
+        list_column.addWidget(self.jump_box)
+        list_column.addWidget(self.results_list)
+        result_column = QVBoxLayout()
+        result_column.addWidget(self.results_label)
+        result_column.addWidget(self.results_view)
+        results_row = QHBoxLayout()
+        results_row.addLayout(list_column, 1)
+        results_row.addLayout(result_column, 3)
+
         # Put results page together and add it to the QStackedLayout pages.
         results_layout = QVBoxLayout()
         results_layout.addLayout(nav_row)
-        results_layout.addWidget(self.results_label)
-        results_layout.addWidget(self.results_view)
+        results_layout.addLayout(results_row)
         results_layout.addLayout(end_row)
 
+        self.results_page = QWidget()
         self.results_page.setLayout(results_layout)
         self.pages.addWidget(self.results_page)
 
         # Add functionality to the buttons.
         prev_btn.clicked.connect(lambda: self.show_results(-1))
         next_btn.clicked.connect(lambda: self.show_results(1))
+        self.results_list.selectionModel().currentChanged.connect(self.select_result)
+        self.filter_box.textChanged.connect(self.filter_results)
+        self.search_box.textChanged.connect(self.search_results)
+        self.jump_box.returnPressed.connect(self.jump_to_term)
         again.clicked.connect(self.start_new_search)
         close.clicked.connect(self.close)
 
     def show_results(self, inc):
-        """This function updates the results page. inc is used to change the entry being shown."""
-        self.results_index += inc
+        """This function updates the results page. inc is used to change the entry being shown.
 
-        # If results_index is out of bounds, make it loop.
-        if self.results_index < 0:
-            self.results_index = len(self.results) - 1
-        elif self.results_index >= len(self.results):
-            self.results_index = 0
+        Previous and Next step through the terms in the list, i.e. only the ones left by the filter, if there is one.
+        """
+        # Step to the term inc rows away in the list, looping around at either end.
+        if inc != 0:
+            i = self.results_model.step(self.results_index, inc)
+            if i is None:
+                return
+            self.results_index = i
+        if self.results_index >= len(self.results):
+            return
 
         # Change text of results' label, view and index label to reflect change.
+        # Results that haven't arrived yet are None.
         self.results_label.setText(self.terms[self.results_index])
-        self.results_view.setPlainText(self.results[self.results_index])
-        self.results_index_label.setText(str(self.results_index + 1) + "/" + str(len(self.results)))
+        result = self.results[self.results_index]
+        if result is None:
+            self.results_view.setPlainText("Still searching for this term...")
+        else:
+            self.results_view.setPlainText(result.render())
+        index_text = str(self.results_index + 1) + "/" + str(len(self.results))
+        if self.search_thread is not None:
+            index_text += " (" + str(len(self.results) - self.results.count(None)) + " looked up so far)"
+        if self.results_model.rows is not None:
+            index_text += " (" + str(len(self.results_model.rows)) + " shown)"
+        self.results_index_label.setText(index_text)
+
+        # Select the term in the list, unless the filter hides it.
+        row = self.results_model.row_of(self.results_index)
+        if row is not None:
+            index = self.results_model.index(row)
+            self.results_list.setCurrentIndex(index)
+            self.results_list.scrollTo(index)
+
+    def select_result(self, current):
+        """This function shows the result of the term selected in the list."""
+        if not current.isValid():
+            return
+        i = self.results_model.index_of(current.row())
+        if i != self.results_index:
+            self.results_index = i
+            self.show_results(0)
+
+    def filter_results(self, text):
+        """This function narrows the list down to the terms containing text, as the user types into filter_box."""
+        self.results_model.set_filter(text)
+        self.show_filtered()
+
+    def search_results(self, text):
+        """This function narrows the list down to the terms whose results match the query typed into search_box."""
+        if text.strip() == '':
+            self.results_model.set_matches(None)
+        else:
+            self.results_model.set_matches(self.result_index.query(text))
+        self.show_filtered()
+
+    def show_filtered(self):
+        """This function updates the results page after the list has been narrowed down or widened again.
+
+        If the term being shown has been filtered out, the first term left is shown instead.
+        """
+        if self.results_model.row_of(self.results_index) is None and self.results_model.rowCount() > 0:
+            self.results_index = self.results_model.index_of(0)
+        self.show_results(0)
+
+    def jump_to_term(self):
+        """This function shows the term typed into jump_box, or the first term starting with it."""
+        i = self.results_model.find(self.jump_box.text())
+        if i is None:
+            self.jump_box.selectAll()
+            QApplication.beep()
+            return
+        if self.results_model.row_of(i) is None:
+            self.filter_box.clear()
+            self.search_box.clear()
+        self.results_index = i
+        self.show_results(0)
+
+    def reset_results_list(self):
+        """This function puts the current terms and results in the results list, clearing its filter."""
+        if self.results_page is None:
+            return
+        for box in (self.filter_box, self.search_box):
+            box.blockSignals(True)
+            box.clear()
+            box.blockSignals(False)
+        self.jump_box.clear()
+        self.results_model.reset(self.terms, self.results)
 
     def start_new_search(self):
-        """This function goes back to the options page for a new search."""
-        self.input_box.setPlainText('')
+        """This function goes back to the options page for a new search, canceling the current one if needed.
+
+        The terms are left in the input box, so the list can be edited and searched again. Only the terms that
+        were added or changed are looked up again (see run_searches()).
+        """
+        if self.search_worker is not None:
+            self.cancel()
         self.results_index = 0
         self.pages.setCurrentWidget(self.options_page)
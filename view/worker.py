@@ -0,0 +1,59 @@
+import threading
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class SearchWorker(QObject):
+    """Runs a streaming dictionary search on a worker thread and reports back to the window through signals.
+
+    The search is one of the iter_ functions in the languages folder, which yield (index, term, result)
+    as each lookup finishes. Every result is passed on to the window as soon as it arrives.
+    The search is called with a cancel event, which cancel() sets so that it stops straight away, even if it
+    is waiting on a website (e.g. to retry after being told to slow down).
+    """
+    # progress = (Number of terms done, total number of terms).
+    progress = pyqtSignal(int, int)
+    # result = (Index of the term, term, Result).
+    result = pyqtSignal(int, str, object)
+    # error = Message of the exception that stopped the search.
+    error = pyqtSignal(str)
+    # finished is emitted after the search ends, whether it finished, was canceled or failed.
+    finished = pyqtSignal()
+
+    def __init__(self, f, args):
+        """f = Streaming search function to call. args = Arguments to call it with. The first must be the terms."""
+        super().__init__()
+        self.f = f
+        self.args = args
+
+        # cancel_process is set to True by the window if the user clicks the cancel button.
+        # stop is the cancel event passed to the search, set at the same time.
+        self.cancel_process = False
+        self.stop = threading.Event()
+
+    def run(self):
+        """This function runs the search. It is connected to the worker thread's started signal."""
+        total = len(self.args[0])
+        lookups = self.f(*self.args, cancel=self.stop)
+        try:
+            n = 1
+            for i, term, result in lookups:
+                if self.cancel_process:
+                    break
+                self.result.emit(i, term, result)
+                self.progress.emit(n, total)
+                n += 1
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            # Closing the generator drops the terms that haven't been looked up yet.
+            lookups.close()
+        self.finished.emit()
+
+    def cancel(self):
+        """This function stops the search. It may be called from any thread.
+
+        The search returns within a fraction of a second, and run() then closes it, dropping the terms that
+        haven't been looked up yet. Downloads that have already started finish in the background.
+        """
+        self.cancel_process = True
+        self.stop.set()